@@ -0,0 +1,218 @@
+import argparse
+import csv
+import logging
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from output_writer import CATEGORY_SEPARATOR, book_key, links_path
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the schema changes; stores of another version are refused
+SCHEMA_VERSION = 1
+
+# Book columns counted per distinct value ('' and non-numeric years/page counts are not counted)
+COUNTED_COLUMNS = ['author', 'publisher', 'publication_place', 'year', 'page_count']
+
+# Rows inserted per transaction when building a store from an existing CSV
+BUILD_BATCH_ROWS = 10_000
+
+
+def aggregates_path(csv_filename: str) -> str:
+    """Return the aggregate store kept next to a CSV."""
+    root, _ = os.path.splitext(csv_filename)
+    return f"{root}_aggregates.sqlite"
+
+
+def to_number(value) -> Optional[int]:
+    """Return a whole number as an int, or None for '', '2010-2012', '366 s.' and the like."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else None
+
+
+def counter_triggers() -> str:
+    """SQL for the triggers that keep the count tables in step with books and links."""
+    insert, delete = [], []
+    for column in COUNTED_COLUMNS:
+        insert.append(f"""
+            INSERT INTO counts (dimension, value, books)
+            SELECT '{column}', NEW.{column}, 1 WHERE NEW.{column} IS NOT NULL AND NEW.{column} <> ''
+            ON CONFLICT (dimension, value) DO UPDATE SET books = books + 1;""")
+        delete.append(f"""
+            UPDATE counts SET books = books - 1 WHERE dimension = '{column}' AND value = OLD.{column};
+            DELETE FROM counts WHERE dimension = '{column}' AND value = OLD.{column} AND books <= 0;""")
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS book_added AFTER INSERT ON books BEGIN
+            {''.join(insert)}
+            INSERT INTO category_years (category, year, books)
+            SELECT category, NEW.year, 1 FROM book_categories WHERE book_id = NEW.book_id AND NEW.year IS NOT NULL
+            ON CONFLICT (category, year) DO UPDATE SET books = books + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS book_removed AFTER DELETE ON books BEGIN
+            {''.join(delete)}
+            UPDATE category_years SET books = books - 1
+            WHERE year = OLD.year AND category IN (SELECT category FROM book_categories WHERE book_id = OLD.book_id);
+            DELETE FROM category_years WHERE books <= 0;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS link_added AFTER INSERT ON book_categories BEGIN
+            INSERT INTO counts (dimension, value, books) SELECT 'category', NEW.category, 1 WHERE true
+            ON CONFLICT (dimension, value) DO UPDATE SET books = books + 1;
+            INSERT INTO category_years (category, year, books)
+            SELECT NEW.category, year, 1 FROM books WHERE book_id = NEW.book_id AND year IS NOT NULL
+            ON CONFLICT (category, year) DO UPDATE SET books = books + 1;
+        END;
+    """
+
+
+class AggregateStore:
+    """Counts behind the insights charts, kept up to date as rows are written.
+
+    Books (by ID) and book <-> category links are stored once; triggers
+    maintain per-value counts of author, publisher, place, year, page count
+    and category, and books per category and year. Writing a book again
+    replaces its previous contribution, so rows can be re-added safely (e.g.
+    after ``--resume``). Queries read the small count tables only.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Set by for_writing(): where finish() moves the store
+        self.final_path = None
+        self.conn = sqlite3.connect(path)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] not in (0, SCHEMA_VERSION):
+            raise ValueError(f"{path} was written by another version of the aggregate store")
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS books (
+                book_id TEXT PRIMARY KEY,
+                author TEXT,
+                publisher TEXT,
+                publication_place TEXT,
+                year INTEGER,
+                page_count INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS book_categories (
+                book_id TEXT NOT NULL,
+                category TEXT NOT NULL,
+                PRIMARY KEY (book_id, category)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS counts (
+                dimension TEXT NOT NULL,
+                value NOT NULL,
+                books INTEGER NOT NULL,
+                PRIMARY KEY (dimension, value)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS category_years (
+                category TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                books INTEGER NOT NULL,
+                PRIMARY KEY (category, year)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+            {counter_triggers()}
+            PRAGMA user_version = {SCHEMA_VERSION};
+        """)
+
+    @classmethod
+    def for_writing(cls, path: str, resume: bool = False) -> 'AggregateStore':
+        """Open ``<path>.partial`` to be filled while a CSV is written, continuing it with ``resume``."""
+        partial_path = f"{path}.partial"
+        if not resume and os.path.exists(partial_path):
+            os.remove(partial_path)
+        store = cls(partial_path)
+        store.final_path = path
+        return store
+
+    def add(self, rows: Iterable[Dict[str, str]], links: Iterable[Tuple[str, str]] = ()):
+        """Add or replace CSV rows, then add (category, book ID) links, in one transaction."""
+        books = []
+        for row in rows:
+            _, book_id = book_key(row)
+            books.append((book_id, row.get('author') or '', row.get('publisher') or '',
+                          row.get('publication_place') or '', to_number(row.get('year')),
+                          to_number(row.get('page_count'))))
+        with self.conn:
+            self.conn.executemany("DELETE FROM books WHERE book_id = ?", ((book[0],) for book in books))
+            self.conn.executemany("INSERT INTO books VALUES (?, ?, ?, ?, ?, ?)", books)
+            self.conn.executemany("INSERT OR IGNORE INTO book_categories (category, book_id) VALUES (?, ?)", links)
+
+    def finish(self, rows: int):
+        """Record that the store matches a finished CSV of ``rows`` rows and move it into place."""
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('rows', ?)", (rows,))
+        self.conn.close()
+        os.replace(self.path, self.final_path)
+
+    def is_finished(self) -> bool:
+        return self.conn.execute("SELECT EXISTS (SELECT 1 FROM meta WHERE key = 'rows')").fetchone()[0] == 1
+
+    def total_books(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+    def counts(self, dimension: str, limit: int = None) -> List[Tuple]:
+        """Return (value, books) pairs of a counted column or 'category', most frequent first."""
+        query = "SELECT value, books FROM counts WHERE dimension = ? ORDER BY books DESC, value"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        return self.conn.execute(query, (dimension,)).fetchall()
+
+    def category_years(self, categories: List[str], first_year: int, last_year: int) -> List[Tuple[str, int, int]]:
+        """Return (category, year, books) for the given categories and years."""
+        marks = ','.join('?' * len(categories))
+        return self.conn.execute(f"""
+            SELECT category, year, books FROM category_years
+            WHERE category IN ({marks}) AND year BETWEEN ? AND ? ORDER BY category, year
+        """, (*categories, first_year, last_year)).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def build(csv_filename: str, path: str = None) -> str:
+    """Build the aggregate store of an existing CSV (and its link table, if any)."""
+    path = path or aggregates_path(csv_filename)
+    store = AggregateStore.for_writing(path)
+
+    link_file = links_path(csv_filename)
+    has_links = os.path.exists(link_file)
+    rows = 0
+    with open(csv_filename, newline='', encoding='utf-8') as f:
+        batch, links = [], []
+        for row in csv.DictReader(f):
+            batch.append(row)
+            if not has_links:
+                # Without a link table, each row lists its own categories
+                category, book_id = book_key(row)
+                links.extend((name, book_id) for name in (row.get('categories') or category).split(CATEGORY_SEPARATOR))
+            if len(batch) >= BUILD_BATCH_ROWS:
+                store.add(batch, links)
+                rows += len(batch)
+                batch, links = [], []
+        store.add(batch, links)
+        rows += len(batch)
+
+    if has_links:
+        with open(link_file, newline='', encoding='utf-8') as f:
+            store.add([], ((row['category'], row['book_id']) for row in csv.DictReader(f)))
+
+    store.finish(rows)
+    logger.info(f"Built {path} from {rows} rows of {csv_filename}")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the insights aggregate store of an existing CSV")
+    parser.add_argument('--output', default='ebooks_az_all_books_detailed.csv',
+                        help="scraped CSV to aggregate (default: ebooks_az_all_books_detailed.csv)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    build(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,30 @@
 import asyncio
 import aiohttp
-from bs4 import BeautifulSoup
 import csv
 from urllib.parse import urljoin
 import logging
-from typing import List, Dict
-import sys
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('scraper.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from typing import List, Dict, Set, Tuple
+import argparse
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from http_cache import HTTPCache, CACHE_PATH, CACHE_MAX_BYTES
+from flow_control import HostRateLimiter, AdaptiveLimiter, RetryPolicy, FetchError, MAX_RETRIES, MAX_CONCURRENCY
+from parsers import (parse_listing, parse_details, StreamingDetailParser, PARSER_BACKENDS, DEFAULT_PARSER,
+                     DETAIL_LABELS)
+from output_writer import StreamingCSVWriter, FLUSH_BATCH_SIZE
+from records import BookRecord
+from columnar import write_columnar
+from aggregate_store import AggregateStore, aggregates_path
+from catalogue_index import build_catalogue_index
+from cover_downloader import CoverDownloader, add_cover_arguments, create_cover_downloader
+from crawl_metrics import Metrics, create_trace_config, start_metrics_server
+from crawl_logging import add_logging_arguments, configure_logging
+
+# Logging is set up by the entry points (configure_logging). Per-page and
+# per-request messages pass their values as arguments, so nothing is
+# formatted for records below the configured level.
 logger = logging.getLogger(__name__)
 
 # Base URL
@@ -59,258 +68,816 @@ CATEGORIES = [
     "/az/category/refeditions",     # Məlumat nəşrləri
 ]
 
-# Semaphore to limit concurrent requests
+# Category names in CATEGORIES order, which also orders each book's categories in the output
+CATEGORY_NAMES = [path.split('/')[-1] for path in CATEGORIES]
+
+# Output file and column order; 'categories' lists all of a book's categories
+# and 'category' is the first of them
+CSV_FILENAME = 'ebooks_az_all_books_detailed.csv'
+CSV_FIELDNAMES = ['category', 'categories', 'title', 'author', 'publisher', 'year',
+                  'publication_place', 'page_count', 'book_url', 'image_url']
+
+# Requests in flight across the whole crawl at the start; the adaptive
+# window then moves between MIN_CONCURRENCY and MAX_CONCURRENCY
 MAX_CONCURRENT_REQUESTS = 10
 
+# Per-host pacing: sustained requests per second and burst size
+RATE_LIMIT_PER_HOST = 5.0
+RATE_LIMIT_BURST = 10
 
-async def fetch_page(session: aiohttp.ClientSession, url: str) -> str:
-    """Fetch a page and return its content."""
-    try:
-        async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
-            response.raise_for_status()
-            return await response.text()
-    except Exception as e:
-        logger.error(f"Error fetching {url}: {e}")
-        return None
+# Books waiting for a detail fetch; listing workers block when it is full
+DETAIL_QUEUE_SIZE = 100
 
+# Where HTML parsing runs: on the event loop, or in a thread or process pool
+PARSE_EXECUTORS = ['inline', 'thread', 'process']
+DEFAULT_PARSE_EXECUTOR = 'inline'
 
-def extract_detail_from_dl(soup: BeautifulSoup, label: str) -> str:
-    """Extract a specific detail from the book detail page."""
-    try:
-        dt_elements = soup.find_all('dt')
-        for dt in dt_elements:
-            if label in dt.get_text():
-                dd = dt.find_next_sibling('dd')
-                if dd:
-                    # Remove any nested links and get just the text
-                    return dd.get_text(strip=True)
-    except Exception as e:
-        logger.debug(f"Error extracting {label}: {e}")
-    return ""
-
-
-async def fetch_book_details(session: aiohttp.ClientSession, book_url: str, semaphore: asyncio.Semaphore) -> Dict[str, str]:
-    """Fetch detailed information from individual book page."""
-    async with semaphore:
-        try:
-            html = await fetch_page(session, book_url)
-            if not html:
-                return {}
+# Bytes read per chunk when streaming a detail page
+STREAM_CHUNK_SIZE = 8 * 1024
 
-            soup = BeautifulSoup(html, 'html.parser')
+# Once the details are found, the rest of the page up to this size is read anyway
+# so the connection goes back to the pool; a longer one is dropped instead
+STREAM_DRAIN_BYTES = 16 * 1024
 
-            # Extract additional details from the book page
-            details = {
-                'publication_place': extract_detail_from_dl(soup, 'Nəşr yeri:'),
-                'page_count': extract_detail_from_dl(soup, 'Səhifə:'),
-            }
 
-            return details
-        except Exception as e:
-            logger.error(f"Error fetching book details from {book_url}: {e}")
-            return {}
+async def fetch_once(session: aiohttp.ClientSession, url: str, cache: HTTPCache = None) -> str:
+    """Send a single request for a page, raising FetchError on failure.
 
+    With a cache, fresh entries are served without a request and stale ones
+    are revalidated with a conditional GET; a 304 is answered from the cache.
+    """
+    entry = cache.get(url) if cache else None
+    if entry and entry.is_fresh(cache.ttl_for(url)):
+        cache.hits += 1
+        return entry.body
 
-def extract_books_from_page(html: str, category_name: str) -> List[Dict]:
-    """Extract all book information from a single category page."""
-    books = []
+    headers = entry.conditional_headers() if entry else {}
 
     try:
-        soup = BeautifulSoup(html, 'html.parser')
+        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            if entry and response.status == 304:
+                cache.revalidated += 1
+                cache.touch(url)
+                return entry.body
 
-        # Find all book cards
-        cards = soup.find_all('div', class_='card mb-5 border-0 shadow-lg p-4 w-100')
+            if response.status >= 400:
+                raise FetchError.from_response(url, response)
 
-        for card in cards:
-            try:
-                # Extract book URL and title
-                title_element = card.find('h5', class_='card-title')
-                link_element = card.find('a', href=True)
-
-                title = title_element.get_text(strip=True) if title_element else ""
-                book_url = link_element['href'] if link_element else ""
-
-                # Extract image URL
-                img_element = card.find('img', class_='img-fluid')
-                image_url = img_element['src'] if img_element else ""
-                if image_url and not image_url.startswith('http'):
-                    image_url = urljoin(BASE_URL, image_url)
-
-                # Extract author, publisher, and year from list items
-                list_items = card.find_all('li', class_='list-group-item text-muted')
-                author = list_items[0].get_text(strip=True) if len(list_items) > 0 else ""
-                publisher = list_items[1].get_text(strip=True) if len(list_items) > 1 else ""
-                year = list_items[2].get_text(strip=True) if len(list_items) > 2 else ""
-
-                books.append({
-                    'category': category_name,
-                    'title': title,
-                    'author': author,
-                    'publisher': publisher,
-                    'year': year,
-                    'book_url': book_url,
-                    'image_url': image_url,
-                    'publication_place': '',  # Will be filled from detail page
-                    'page_count': ''  # Will be filled from detail page
-                })
-            except Exception as e:
-                logger.error(f"Error extracting book data from card: {e}")
-                continue
+            html = await response.text()
 
-    except Exception as e:
-        logger.error(f"Error parsing page HTML: {e}")
+            if cache:
+                cache.misses += 1
+                cache.put(url, html, response.headers.get('ETag'), response.headers.get('Last-Modified'))
 
-    return books
+            return html
+    except FetchError:
+        raise
+    except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+        raise FetchError(url, str(e) or type(e).__name__)
 
 
-def get_total_pages(html: str) -> int:
-    """Try to determine total number of pages from pagination."""
-    try:
-        soup = BeautifulSoup(html, 'html.parser')
-        pagination = soup.find('nav', attrs={'aria-label': 'Page navigation'})
-        if not pagination:
-            return 1
-
-        # Look for all page links
-        page_links = pagination.find_all('a', class_='page-link')
-        max_page = 1
-
-        for link in page_links:
-            # Try to extract page number from the link href
-            href = link.get('href', '')
-            if 'page=' in href:
-                try:
-                    page_str = href.split('page=')[1].split('&')[0]
-                    page_num = int(page_str)
-                    if page_num > max_page:
-                        max_page = page_num
-                except (ValueError, IndexError):
-                    pass
-
-            # Also try to get it from the link text
-            try:
-                page_num = int(link.get_text(strip=True))
-                if page_num > max_page:
-                    max_page = page_num
-            except ValueError:
-                continue
+async def fetch_details_once(session: aiohttp.ClientSession, url: str, labels: Dict[str, str] = DETAIL_LABELS,
+                             metrics: Metrics = None) -> Dict[str, str]:
+    """Stream a book page until every label is found, raising FetchError on failure.
 
-        return max_page
-    except Exception as e:
-        logger.error(f"Error determining total pages: {e}")
-        return 1
+    The page is parsed chunk by chunk as it arrives and the rest of it is
+    not downloaded; the body is never cached, as it is incomplete. Streamed
+    bytes are not seen by the trace config, so they are counted here.
+    """
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            if response.status >= 400:
+                raise FetchError.from_response(url, response)
+
+            extractor = StreamingDetailParser(labels, response.charset or 'utf-8')
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                extractor.feed_bytes(chunk)
+                if extractor.done:
+                    break
+
+            if not response.content.at_eof():
+                # An HTTP/1.1 connection is only reusable once its body is read to the end
+                if response.content_length and response.content_length - extractor.bytes_read <= STREAM_DRAIN_BYTES:
+                    extractor.bytes_read += len(await response.content.read())
+                else:
+                    response.close()
+            if metrics:
+                metrics.inc('bytes_downloaded_total', extractor.bytes_read)
+            return extractor.details
+    except FetchError:
+        raise
+    except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+        raise FetchError(url, str(e) or type(e).__name__)
+
+
+async def fetch_page(session: aiohttp.ClientSession, url: str, cache: HTTPCache = None,
+                     retry: RetryPolicy = None) -> str:
+    """Fetch a page and return its content, or None once retries are exhausted."""
+    retry = retry or RetryPolicy()
+    try:
+        return await retry.run(lambda: fetch_once(session, url, cache))
+    except FetchError as e:
+        logger.error("Error fetching %s: %s", url, e)
+        return None
 
 
-async def scrape_category(session: aiohttp.ClientSession, category_path: str, detail_semaphore: asyncio.Semaphore) -> List[Dict]:
-    """Scrape all books from a category, handling pagination."""
-    category_name = category_path.split('/')[-1]
-    all_books = []
+class BookIndex:
+    """Books from a previous run, used by incremental mode.
 
-    logger.info(f"\nScraping category: {category_name}")
+    Detail fields are looked up by book ID so a book already scraped with its
+    publication place and page count never needs its detail page again.
+    Categories are merged across rows, since a CSV without the 'categories'
+    column lists a book once per category.
+    """
 
-    # Fetch first page to determine total pages
-    url = urljoin(BASE_URL, category_path)
-    html = await fetch_page(session, url)
+    def __init__(self, books: List[BookRecord]):
+        self.books = books
+        self.by_id: Dict[str, BookRecord] = {}
+        self.categories: Dict[str, Set[str]] = {}
 
-    if not html:
-        logger.error(f"Failed to fetch first page for category {category_name}")
-        return []
+        for book in books:
+            book_id = book.book_id
+            if book_id:
+                self.categories.setdefault(book_id, set()).update(book.category_list())
+                previous = self.by_id.get(book_id)
+                if previous is None or not previous.has_details():
+                    self.by_id[book_id] = book
 
-    total_pages = get_total_pages(html)
-    logger.info(f"  Total pages detected: {total_pages}")
+    @classmethod
+    def load(cls, csv_filename: str) -> 'BookIndex':
+        """Load the previous output, or an empty index if there is none."""
+        try:
+            with open(csv_filename, newline='', encoding='utf-8') as csvfile:
+                books = [BookRecord.from_row(row) for row in csv.DictReader(csvfile)]
+        except FileNotFoundError:
+            logger.warning(f"No previous dataset at {csv_filename}, running a full crawl")
+            books = []
+
+        index = cls(books)
+        logger.info(f"Loaded {len(books)} previous records "
+                    f"({sum(book.has_details() for book in books)} with full details)")
+        return index
+
+    def known_details(self, book_id: str) -> Dict[str, str]:
+        """Return previously scraped detail fields for a book, or None."""
+        book = self.by_id.get(book_id)
+        if book is None or not book.has_details():
+            return None
+        return {'publication_place': book.publication_place, 'page_count': book.page_count}
+
+    def is_listed(self, category_name: str, book_id: str) -> bool:
+        """Return True if the book was already listed under the category."""
+        return category_name in self.categories.get(book_id, ())
+
+    def unseen(self, writer: StreamingCSVWriter) -> List[BookRecord]:
+        """Return previous records, one per category, whose listing was not written this run.
+
+        Pagination stops once a page contains only known books, so the older
+        books of each category are carried over from the previous output.
+        """
+        unseen = []
+        for book in self.books:
+            for category in book.category_list():
+                record = book if category == book.category else book.with_category(category)
+                if not writer.is_written(record.key()):
+                    unseen.append(record)
+        return unseen
+
+
+class CategoryState:
+    """Progress of a single category, or a range of its pages, through the crawl."""
+
+    def __init__(self, category_path: str, first_page: int = 1, last_page: int = None):
+        self.path = category_path
+        self.name = category_path.split('/')[-1]
+        self.first_page = first_page
+        self.last_page = last_page
+        self.total_pages = 0
+        self.pending_pages = 0
+        self.book_count = 0
+        # Books per listing page not yet written to the output
+        self.unwritten: Dict[int, int] = {}
+        self.pending_details = 0
+        self.listing_done = False
+        self.failed_pages = 0
+        self.queued_pages = set()
+
+    def is_complete(self) -> bool:
+        """Return True once listing and details are done."""
+        return self.listing_done and self.pending_details == 0
+
+    def final_page(self) -> int:
+        """Return the last page to crawl: the end of the range or of the category."""
+        if self.last_page is None:
+            return self.total_pages
+        return min(self.last_page, self.total_pages)
+
+    def page_url(self, base_url: str, page: int) -> str:
+        """Return the URL of a listing page."""
+        return urljoin(base_url, self.path if page == 1 else f"{self.path}?page={page}")
+
+
+class CrawlScheduler:
+    """Crawl all categories as a listing -> detail pipeline.
+
+    Listing pages of every category are queued as independent jobs. Each card
+    parsed from a listing page goes straight onto a bounded detail queue that
+    a second pool of workers drains while listings are still downloading; a
+    full detail queue blocks the listing workers, which keeps memory flat. The
+    number of requests in flight follows an AIMD window that starts at
+    ``concurrency``, and the request rate to each host is paced by a token
+    bucket instead of fixed sleeps. Transient failures are retried with
+    backoff; pages that still fail are retried once more at the end of the run.
+
+    A book listed in several categories has its detail page fetched once:
+    listings of a book whose row is already written skip the detail stage, and
+    listings that reach it while its fetch is in flight wait for that fetch.
+
+    With a ``BookIndex`` (incremental mode) books whose details are already
+    known skip the detail stage, and a category's pages are fetched one after
+    another until a page lists only books seen in the previous run.
+
+    With a ``parse_executor`` the raw HTML is parsed in a thread or process
+    pool so CPU-bound parsing does not stall network I/O on the event loop.
+
+    With ``stream_details`` detail pages are parsed as they download and the
+    transfer stops once every field in ``detail_labels`` is found; pages
+    fresh in the HTTP cache are still read from it.
+
+    Every book is handed to the ``writer`` as soon as its details are
+    resolved; pages and categories already in the writer's checkpoint are
+    skipped.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, writer: StreamingCSVWriter,
+                 concurrency: int = MAX_CONCURRENT_REQUESTS, rate: float = RATE_LIMIT_PER_HOST,
+                 burst: int = RATE_LIMIT_BURST, detail_queue_size: int = DETAIL_QUEUE_SIZE, cache: HTTPCache = None,
+                 index: BookIndex = None, parser: str = DEFAULT_PARSER, parse_executor: Executor = None,
+                 retry: RetryPolicy = None, max_concurrency: int = MAX_CONCURRENCY, metrics: Metrics = None,
+                 base_url: str = BASE_URL, stream_details: bool = False,
+                 detail_labels: Dict[str, str] = DETAIL_LABELS, rate_limiter: HostRateLimiter = None):
+        self.session = session
+        self.base_url = base_url
+        self.metrics = metrics or Metrics()
+        self.writer = writer
+        self.parser = parser
+        self.parse_executor = parse_executor
+        self.stream_details = stream_details
+        self.detail_labels = detail_labels
+        self.cache = cache
+        self.index = index
+        self.limiter = AdaptiveLimiter(concurrency, maximum=max(concurrency, max_concurrency))
+        self.retry = retry or RetryPolicy()
+        # Shared with the cover downloader, and across the shards a worker crawls
+        self.rate_limiter = rate_limiter or HostRateLimiter(rate, burst)
+        self.listing_queue: asyncio.Queue = asyncio.Queue()
+        self.detail_queue: asyncio.Queue = asyncio.Queue(maxsize=detail_queue_size)
+        self.categories: Dict[str, CategoryState] = {}
+        self.requests = 0
+        self.retries = 0
+        self.skipped_details = 0
+        # Detail fetches in flight by book ID, shared by every category listing the book
+        self.detail_futures: Dict[str, asyncio.Future] = {}
+        self.shared_details = 0
+        # Work that failed after all retries, tried once more at the end
+        self.failed_listings: List[Tuple[CategoryState, int]] = []
+        self.failed_details: List[Tuple[CategoryState, int, BookRecord]] = []
+        self.final_pass = False
+        # Optional cover stage; every newly written book's cover is queued on it
+        self.covers: CoverDownloader = None
+
+        self.metrics.gauge_callback('requests_in_flight', lambda: self.limiter.in_flight)
+        self.metrics.gauge_callback('concurrency_window', lambda: int(self.limiter.limit))
+        self.metrics.gauge_callback('listing_queue_depth', self.listing_queue.qsize)
+        self.metrics.gauge_callback('detail_queue_depth', self.detail_queue.qsize)
+        if cache:
+            self.metrics.gauge_callback('cache_hit_ratio', cache.hit_ratio)
+
+    async def fetch(self, url: str, stage: str, category_name: str, labels: Dict[str, str] = None):
+        """Fetch a page within the concurrency window and the host's rate limit.
+
+        Retryable failures release their slot while backing off. Returns None
+        once the retries are exhausted. With ``labels`` the page is streamed
+        and its detail fields are returned instead of the HTML.
+        """
+        if labels is None and self.cache and self.cache.is_fresh(url):
+            self.metrics.inc('cache_fresh_hits_total', stage=stage)
+            return await fetch_once(self.session, url, self.cache)
+
+        async def request():
+            async with self.limiter:
+                await self.rate_limiter.acquire(url)
+                self.requests += 1
+                self.metrics.inc('requests_total', stage=stage, category=category_name)
+                started = time.perf_counter()
+                try:
+                    if labels is None:
+                        result = await fetch_once(self.session, url, self.cache)
+                    else:
+                        result = await fetch_details_once(self.session, url, labels, self.metrics)
+                    self.limiter.record_success(time.perf_counter() - started)
+                    return result
+                except FetchError as e:
+                    if e.retryable:
+                        self.limiter.record_failure()
+                    raise
+                finally:
+                    self.metrics.observe('stage_seconds', time.perf_counter() - started, stage=stage)
+
+        def on_retry(error: FetchError, delay: float):
+            self.retries += 1
+            self.metrics.inc('retries_total', stage=stage)
+            logger.warning("Retrying %s in %.1fs after %s", url, delay, error)
 
-    # Extract books from first page
-    books = extract_books_from_page(html, category_name)
-    all_books.extend(books)
-    logger.info(f"  Page 1/{total_pages}: Found {len(books)} books")
+        try:
+            return await self.retry.run(request, on_retry)
+        except FetchError as e:
+            logger.error("Error fetching %s: %s", url, e)
+            self.metrics.inc('fetch_failures_total', stage=stage, category=category_name)
+            return None
+
+    async def parse(self, func, *args):
+        """Run a parsers function with this crawl's backend, in the executor if there is one."""
+        started = time.perf_counter()
+        try:
+            if self.parse_executor is None:
+                return func(self.parser, *args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.parse_executor, func, self.parser, *args)
+        finally:
+            self.metrics.observe('stage_seconds', time.perf_counter() - started, stage='parse')
+
+    async def run(self, category_paths: List[str], page_range: Tuple[int, int] = None) -> int:
+        """Crawl the given categories and return the number of books found.
+
+        With ``page_range`` only pages first..last (inclusive, last may be
+        None for the end) of each category are crawled.
+        """
+        first_page, last_page = page_range or (1, None)
+        for category_path in category_paths:
+            state = CategoryState(category_path, first_page, last_page)
+            self.categories[category_path] = state
+            if self.writer.checkpoint.is_category_done(state.name):
+                logger.info(f"Skipping category {state.name}: complete in checkpoint")
+                continue
+            self.listing_queue.put_nowait((self.crawl_first_page, (state,)))
 
-    # Fetch remaining pages
-    for page in range(2, total_pages + 1):
-        url = urljoin(BASE_URL, f"{category_path}?page={page}")
-        html = await fetch_page(session, url)
+        # Enough workers to fill the widest window the limiter may open
+        workers = [asyncio.create_task(self.listing_worker()) for _ in range(self.limiter.maximum)]
+        workers += [asyncio.create_task(self.detail_worker()) for _ in range(self.limiter.maximum)]
+        try:
+            await self.drain()
+            if self.failed_listings or self.failed_details:
+                await self.retry_failed()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        return sum(state.book_count for state in self.categories.values())
+
+    async def drain(self):
+        """Wait until every queued listing and detail job has finished."""
+        # Listing jobs only finish once their cards are queued, so by the
+        # time the listing queue is drained every detail job is enqueued.
+        await self.listing_queue.join()
+        await self.detail_queue.join()
+
+    async def retry_failed(self):
+        """Give pages that failed during the run one last attempt."""
+        logger.info(f"Retrying {len(self.failed_listings)} failed listing pages "
+                    f"and {len(self.failed_details)} failed detail pages")
+        self.final_pass = True
+
+        failed_listings, self.failed_listings = self.failed_listings, []
+        for state, page in failed_listings:
+            state.failed_pages -= 1
+            if page == state.first_page:
+                self.listing_queue.put_nowait((self.crawl_first_page, (state,)))
+            else:
+                state.listing_done = False
+                state.queued_pages.discard(page)
+                self.queue_listing_page(state, page)
+
+        failed_details, self.failed_details = self.failed_details, []
+        for item in failed_details:
+            await self.detail_queue.put(item)
+
+        await self.drain()
+
+    async def listing_worker(self):
+        """Take listing jobs off the queue until cancelled."""
+        while True:
+            job, args = await self.listing_queue.get()
+            try:
+                await job(*args)
+            except Exception as e:
+                logger.error(f"Error running {job.__name__}{args}: {e}")
+                # Listing jobs take (state, page) or, for the first page, (state,)
+                state, page = args[0], args[1] if len(args) > 1 else args[0].first_page
+                self.listing_failed(state, page)
+            finally:
+                self.listing_queue.task_done()
+
+    async def detail_worker(self):
+        """Take books off the detail queue until cancelled."""
+        while True:
+            state, page, book = await self.detail_queue.get()
+            fetched = False
+            try:
+                fetched = await self.fetch_book_details(state, book)
+            except Exception as e:
+                logger.error("Error fetching book details from %s: %s", book.book_url, e)
+            finally:
+                if not fetched and not self.final_pass:
+                    self.failed_details.append((state, page, book))
+                else:
+                    state.pending_details -= 1
+                    self.write_book(state, page, book)
+                    self.check_complete(state)
+                self.detail_queue.task_done()
+
+    async def crawl_first_page(self, state: CategoryState):
+        """Fetch the first page of a category (or page range) and queue the rest."""
+        page = state.first_page
+        logger.info(f"Scraping category: {state.name}" + (f" from page {page}" if page > 1 else ""))
+
+        html = await self.fetch(state.page_url(self.base_url, page), 'listing_fetch', state.name)
 
         if not html:
-            logger.warning(f"  Failed to fetch page {page}")
-            continue
+            logger.error("Failed to fetch page %d for category %s", page, state.name)
+            self.listing_failed(state, page)
+            return
 
-        books = extract_books_from_page(html, category_name)
-        all_books.extend(books)
-        logger.info(f"  Page {page}/{total_pages}: Found {len(books)} books")
+        total_pages, books = await self.parse(parse_listing, html, state.name, self.base_url)
+        # A range may start on the last page, which links no later one
+        state.total_pages = max(total_pages, page)
+        logger.info(f"  [{state.name}] Total pages detected: {state.total_pages}")
 
-        # Small delay to be polite
-        await asyncio.sleep(0.5)
+        if self.index is None:
+            for next_page in range(page + 1, state.final_page() + 1):
+                self.queue_listing_page(state, next_page)
 
-    logger.info(f"  Category total: {len(all_books)} books")
+        await self.add_listing_page(state, page, books)
 
-    # Now fetch details for each book in batches
-    logger.info(f"  Fetching detailed information for {len(all_books)} books...")
-
-    tasks = []
-    for book in all_books:
-        if book['book_url']:
-            task = fetch_book_details(session, book['book_url'], detail_semaphore)
-            tasks.append(task)
-        else:
-            tasks.append(asyncio.sleep(0))  # Placeholder for books without URLs
+        if state.pending_pages == 0:
+            self.listing_complete(state)
 
-    # Fetch all book details concurrently with rate limiting
-    details_list = await asyncio.gather(*tasks)
-
-    # Merge details into books
-    for i, details in enumerate(details_list):
-        if isinstance(details, dict):
-            all_books[i].update(details)
+    async def crawl_listing_page(self, state: CategoryState, page: int):
+        """Fetch one listing page of a category."""
+        try:
+            if self.skip_done_page(state, page):
+                return
 
-    logger.info(f"  Completed category {category_name}: {len(all_books)} books with full details")
+            html = await self.fetch(state.page_url(self.base_url, page), 'listing_fetch', state.name)
 
-    return all_books
+            if not html:
+                logger.warning("  [%s] Failed to fetch page %d", state.name, page)
+                self.listing_failed(state, page)
+                if self.index is not None and page < state.final_page():
+                    self.queue_listing_page(state, page + 1)
+                return
+
+            _, books = await self.parse(parse_listing, html, state.name, self.base_url)
+            await self.add_listing_page(state, page, books)
+        except asyncio.CancelledError:
+            # An interrupted run must not checkpoint the category as complete
+            state.failed_pages += 1
+            raise
+        except Exception as e:
+            # Handled here rather than by the worker, so the page counts as failed
+            # before the finally below can complete the category
+            logger.error("  [%s] Error on page %d: %s", state.name, page, e)
+            self.listing_failed(state, page)
+        finally:
+            state.pending_pages -= 1
+            if state.pending_pages == 0:
+                self.listing_complete(state)
+
+    def incomplete_categories(self) -> List[str]:
+        """Return the categories of this run not recorded as complete in the checkpoint."""
+        return [state.name for state in self.categories.values()
+                if not self.writer.checkpoint.is_category_done(state.name)]
+
+    def listing_failed(self, state: CategoryState, page: int):
+        """Remember a listing page that could not be fetched."""
+        state.failed_pages += 1
+        if not self.final_pass:
+            self.failed_listings.append((state, page))
+
+    def queue_listing_page(self, state: CategoryState, page: int):
+        """Schedule a listing page of a category, once."""
+        if page in state.queued_pages:
+            return
+        state.queued_pages.add(page)
+        state.pending_pages += 1
+        self.listing_queue.put_nowait((self.crawl_listing_page, (state, page)))
+
+    def skip_done_page(self, state: CategoryState, page: int) -> bool:
+        """Return True if the checkpoint already holds a page's books."""
+        if not self.writer.checkpoint.is_page_done(state.name, page):
+            return False
+
+        logger.info("  [%s] Page %d/%d: complete in checkpoint", state.name, page, state.total_pages)
+        if self.index is not None and page < state.final_page():
+            self.queue_listing_page(state, page + 1)
+        return True
+
+    async def add_listing_page(self, state: CategoryState, page: int, books: List[BookRecord]):
+        """Write a listing page's resolved books and hand the rest to the detail workers."""
+        if self.skip_done_page(state, page):
+            return
+
+        state.book_count += len(books)
+        self.metrics.inc('pages_total', category=state.name)
+        state.unwritten[page] = len(books)
+        logger.info("  [%s] Page %d/%d: Found %d books", state.name, page, state.total_pages, len(books))
+
+        if not books:
+            self.writer.page_done(state.name, page)
+
+        has_new_books = False
+        for book in books:
+            # Books without a detail page, or already written before a resume
+            if not book.book_url or self.writer.is_written(book.key()):
+                self.write_book(state, page, book)
+                continue
 
+            if self.index is not None:
+                book_id = book.book_id
+                if not self.index.is_listed(state.name, book_id):
+                    has_new_books = True
+
+                details = self.index.known_details(book_id)
+                if details:
+                    book.update(details)
+                    self.skipped_details += 1
+                    self.write_book(state, page, book)
+                    continue
+
+            # Already written under another category; only the link is new
+            if self.writer.has_book(book.book_id):
+                self.shared_details += 1
+                self.write_book(state, page, book)
+                continue
 
-async def main():
+            state.pending_details += 1
+            await self.detail_queue.put((state, page, book))
+
+        if self.index is not None:
+            if has_new_books and page < state.final_page():
+                self.queue_listing_page(state, page + 1)
+            elif page < state.final_page():
+                logger.info("  [%s] Page %d has no new books, stopping pagination", state.name, page)
+
+    def listing_complete(self, state: CategoryState):
+        """Mark a category's listing as finished."""
+        state.listing_done = True
+        logger.info(f"  [{state.name}] Category total: {state.book_count} books")
+        self.check_complete(state)
+
+    def write_book(self, state: CategoryState, page: int, book: BookRecord):
+        """Send a resolved book to the output, completing its page when it is the last."""
+        if self.covers and not self.writer.has_book(book.book_id):
+            self.covers.submit(book.key()[1], book.image_url)
+        with self.metrics.timer('stage_seconds', stage='write'):
+            self.writer.write(book)
+        self.metrics.inc('books_total', category=state.name)
+        state.unwritten[page] -= 1
+        if state.unwritten[page] == 0:
+            self.writer.page_done(state.name, page)
+
+    def check_complete(self, state: CategoryState):
+        """Record the category as finished once listing and details are done."""
+        if not state.is_complete():
+            return
+
+        if state.failed_pages:
+            logger.warning(f"  Finished category {state.name} with {state.failed_pages} failed pages: "
+                           f"{state.book_count} books so far")
+        else:
+            self.writer.category_done(state.name)
+            logger.info(f"  Completed category {state.name}: {state.book_count} books with full details")
+
+    async def fetch_book_details(self, state: CategoryState, book: BookRecord) -> bool:
+        """Fetch a book's detail page and merge its fields into the record.
+
+        Concurrent calls for the same book share a single fetch, and books
+        already written under another category are not fetched again.
+        """
+        book_id = book.book_id
+        pending = self.detail_futures.get(book_id)
+        if self.writer.has_book(book_id):
+            # Fetched and written for another category while this one was queued
+            self.shared_details += 1
+            return True
+        if pending is not None:
+            self.shared_details += 1
+            details = await asyncio.shield(pending)
+        else:
+            pending = asyncio.get_running_loop().create_future()
+            self.detail_futures[book_id] = pending
+            details = None
+            try:
+                if self.stream_details and not (self.cache and self.cache.is_fresh(book.book_url)):
+                    details = await self.fetch(book.book_url, 'detail_fetch', state.name, self.detail_labels)
+                else:
+                    html = await self.fetch(book.book_url, 'detail_fetch', state.name)
+                    if html:
+                        details = await self.parse(parse_details, html, self.detail_labels)
+            finally:
+                # Waiters of a failed fetch get None and are retried like any failure
+                del self.detail_futures[book_id]
+                pending.set_result(details)
+
+        if details is None:
+            return False
+        book.update(details)
+        return True
+
+
+def build_arg_parser(description: str = "Scrape the ebooks.az catalogue") -> argparse.ArgumentParser:
+    """Build the command line parser shared by the scraper entry points."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--base-url', default=BASE_URL,
+                        help=f"site to crawl, e.g. a local mirror (default: {BASE_URL})")
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENT_REQUESTS,
+                        help=f"requests in flight at the start (default: {MAX_CONCURRENT_REQUESTS})")
+    parser.add_argument('--max-concurrency', type=int, default=MAX_CONCURRENCY,
+                        help=f"ceiling for the adaptive concurrency window (default: {MAX_CONCURRENCY})")
+    parser.add_argument('--retries', type=int, default=MAX_RETRIES,
+                        help=f"retries per request for 429/5xx/timeouts (default: {MAX_RETRIES})")
+    parser.add_argument('--rate', type=float, default=RATE_LIMIT_PER_HOST,
+                        help=f"requests per second per host, 0 disables (default: {RATE_LIMIT_PER_HOST})")
+    parser.add_argument('--burst', type=int, default=RATE_LIMIT_BURST,
+                        help=f"token bucket size per host (default: {RATE_LIMIT_BURST})")
+    parser.add_argument('--detail-queue-size', type=int, default=DETAIL_QUEUE_SIZE,
+                        help=f"books buffered for detail fetching (default: {DETAIL_QUEUE_SIZE})")
+    parser.add_argument('--parser', choices=list(PARSER_BACKENDS), default=DEFAULT_PARSER,
+                        help=f"HTML parser backend (default: {DEFAULT_PARSER})")
+    parser.add_argument('--parse-executor', choices=PARSE_EXECUTORS, default=DEFAULT_PARSE_EXECUTOR,
+                        help=f"where HTML is parsed (default: {DEFAULT_PARSE_EXECUTOR})")
+    parser.add_argument('--parse-workers', type=int, default=os.cpu_count(),
+                        help="thread or process pool size for parsing (default: CPU count)")
+    parser.add_argument('--stream-details', action='store_true',
+                        help="parse detail pages while downloading and stop once the fields are found")
+    parser.add_argument('--incremental', action='store_true',
+                        help="reuse the previous output and only fetch details for new or changed books")
+    parser.add_argument('--output', default=CSV_FILENAME,
+                        help=f"CSV file to write (default: {CSV_FILENAME})")
+    parser.add_argument('--columnar', choices=['parquet', 'feather', 'none'], default='parquet',
+                        help="also write a typed columnar copy of the output (default: parquet)")
+    parser.add_argument('--no-aggregates', action='store_true',
+                        help="do not maintain the aggregate store read by generate_insights.py")
+    parser.add_argument('--no-catalogue', action='store_true',
+                        help="do not build the searchable catalogue index (see catalogue_index.py)")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run from its checkpoint and partial output")
+    parser.add_argument('--covers', action='store_true',
+                        help="also mirror every book's cover image while crawling (see cover_downloader.py)")
+    add_cover_arguments(parser)
+    add_logging_arguments(parser)
+    parser.add_argument('--flush-every', type=int, default=FLUSH_BATCH_SIZE,
+                        help=f"rows buffered before each write to disk (default: {FLUSH_BATCH_SIZE})")
+    parser.add_argument('--metrics-port', type=int,
+                        help="serve Prometheus metrics on this port while crawling")
+    parser.add_argument('--metrics-json', help="write a JSON metrics summary to this file at the end")
+    parser.add_argument('--cache', default=CACHE_PATH,
+                        help=f"on-disk HTTP cache file (default: {CACHE_PATH})")
+    parser.add_argument('--no-cache', action='store_true', help="disable the HTTP cache")
+    parser.add_argument('--cache-size-mb', type=int, default=CACHE_MAX_BYTES // (1024 * 1024),
+                        help=f"HTTP cache size cap in MB (default: {CACHE_MAX_BYTES // (1024 * 1024)})")
+    return parser
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """Parse command line options."""
+    return build_arg_parser().parse_args(argv)
+
+
+def create_parse_executor(kind: str, workers: int) -> Executor:
+    """Create the pool HTML is parsed in, or None to parse on the event loop."""
+    if kind == 'process':
+        return ProcessPoolExecutor(max_workers=workers)
+    if kind == 'thread':
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='parse')
+    return None
+
+
+def create_session(args: argparse.Namespace, metrics: Metrics) -> aiohttp.ClientSession:
+    """Create the HTTP session for a crawl, sized to its concurrency ceiling."""
+    max_concurrency = max(args.concurrency, args.max_concurrency)
+    connector = aiohttp.TCPConnector(limit=max(50, max_concurrency), limit_per_host=max_concurrency)
+    timeout = aiohttp.ClientTimeout(total=60)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                 trace_configs=[create_trace_config(metrics)])
+
+
+def create_scheduler(session: aiohttp.ClientSession, args: argparse.Namespace, writer: StreamingCSVWriter,
+                     cache: HTTPCache, index: BookIndex, parse_executor: Executor,
+                     metrics: Metrics, rate_limiter: HostRateLimiter = None) -> CrawlScheduler:
+    """Create a scheduler configured from the command line options."""
+    return CrawlScheduler(session, writer, args.concurrency, args.rate, args.burst, args.detail_queue_size, cache,
+                          index, args.parser, parse_executor, RetryPolicy(args.retries),
+                          max(args.concurrency, args.max_concurrency), metrics, args.base_url,
+                          args.stream_details, rate_limiter=rate_limiter)
+
+
+def log_crawl_summary(scheduler: CrawlScheduler, metrics: Metrics, total_books: int, elapsed: float):
+    """Log throughput, retries and per-stage timings at the end of a crawl."""
+    logger.info(f"\n\nScraping complete! Total books collected: {total_books}")
+    logger.info(f"Wall-clock time: {elapsed:.1f}s, {scheduler.requests} requests "
+                f"({scheduler.requests / elapsed if elapsed else 0:.2f} req/s)")
+    if scheduler.shared_details:
+        logger.info(f"Detail pages shared across categories: {scheduler.shared_details} fetches saved")
+    logger.info(f"Retries: {scheduler.retries}, final concurrency window: {int(scheduler.limiter.limit)} "
+                f"({scheduler.limiter.increases} increases, {scheduler.limiter.decreases} decreases)")
+    incomplete = scheduler.incomplete_categories()
+    if incomplete:
+        logger.warning(f"{len(incomplete)} categories are incomplete: {', '.join(incomplete)}")
+    metrics.log_summary()
+    if metrics.counter_value('bytes_downloaded_total'):
+        logger.info(f"Downloaded {metrics.counter_value('bytes_downloaded_total') / 1e6:.1f} MB")
+
+
+async def main(args: argparse.Namespace = None):
     """Main scraping function."""
+    if args is None:
+        args = parse_args([])
+
     logger.info("Starting async scraper for ebooks.az")
     logger.info(f"Total categories to scrape: {len(CATEGORIES)}")
+    logger.info(f"Concurrency: {args.concurrency}, rate limit: {args.rate} req/s per host (burst {args.burst})")
 
-    all_books = []
-    detail_semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    cache = None if args.no_cache else HTTPCache(args.cache, args.cache_size_mb * 1024 * 1024)
+    index = BookIndex.load(args.output) if args.incremental else None
+    parse_executor = create_parse_executor(args.parse_executor, args.parse_workers)
+    if parse_executor:
+        logger.info(f"Parsing with {args.parser} in a {args.parse_executor} pool of {args.parse_workers} workers")
 
-    # Create a single session for all requests
-    connector = aiohttp.TCPConnector(limit=50, limit_per_host=10)
-    timeout = aiohttp.ClientTimeout(total=60)
+    aggregates = None if args.no_aggregates else AggregateStore.for_writing(aggregates_path(args.output), args.resume)
+    writer = StreamingCSVWriter(args.output, CSV_FIELDNAMES, args.flush_every, resume=args.resume,
+                                aggregates=aggregates, category_order=CATEGORY_NAMES)
+    metrics = Metrics()
+    metrics_server = await start_metrics_server(metrics, args.metrics_port) if args.metrics_port else None
 
-    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-        for i, category in enumerate(CATEGORIES, 1):
-            logger.info(f"\n[{i}/{len(CATEGORIES)}] Processing category: {category}")
+    started = time.monotonic()
 
+    try:
+        # A single session for all requests
+        async with create_session(args, metrics) as session:
+            scheduler = create_scheduler(session, args, writer, cache, index, parse_executor, metrics)
+            scheduler.covers = create_cover_downloader(session, args, scheduler.rate_limiter, scheduler.retry,
+                                                       metrics)
             try:
-                books = await scrape_category(session, category, detail_semaphore)
-                all_books.extend(books)
-                logger.info(f"Overall total: {len(all_books)} books")
-
-                # Add delay between categories
-                await asyncio.sleep(2)
-
-            except Exception as e:
-                logger.error(f"Error processing category {category}: {e}")
-                continue
-
-    # Save to CSV
-    logger.info(f"\n\nScraping complete! Total books collected: {len(all_books)}")
-    logger.info("Saving to CSV...")
-
-    csv_filename = 'ebooks_az_all_books_detailed.csv'
-
-    with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['category', 'title', 'author', 'publisher', 'year',
-                     'publication_place', 'page_count', 'book_url', 'image_url']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-        writer.writeheader()
-        writer.writerows(all_books)
-
-    logger.info(f"Data saved to {csv_filename}")
-    logger.info(f"Total records: {len(all_books)}")
+                total_books = await scheduler.run(CATEGORIES)
+                if scheduler.covers:
+                    await scheduler.covers.join()
+            finally:
+                if scheduler.covers:
+                    scheduler.covers.close()
+
+        if index is not None:
+            logger.info(f"Incremental run: reused details for {scheduler.skipped_details} known books")
+            for book in index.unseen(writer):
+                writer.write(book)
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        if cache:
+            cache.close()
+        if parse_executor:
+            parse_executor.shutdown()
+        if metrics_server:
+            await metrics_server.cleanup()
+
+    log_crawl_summary(scheduler, metrics, total_books, time.monotonic() - started)
+    if scheduler.covers:
+        scheduler.covers.log_summary()
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
+
+    incomplete = scheduler.incomplete_categories()
+    if incomplete:
+        # Keep the partial file and the checkpoint so --resume crawls only what is missing
+        writer.abort()
+        logger.error(f"Not publishing {args.output}: {', '.join(incomplete)} incomplete")
+        raise SystemExit(1)
+
+    writer.close()
+    logger.info(f"Total records: {writer.rows}")
+
+    if not args.no_catalogue:
+        build_catalogue_index(args.output)
+    if args.columnar != 'none':
+        write_columnar(args.output, fmt=args.columnar)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    stop_logging = configure_logging(args)
+    try:
+        asyncio.run(main(args))
+    finally:
+        stop_logging()
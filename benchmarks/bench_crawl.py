@@ -0,0 +1,176 @@
+"""End-to-end crawl benchmark against the local mock site.
+
+Starts benchmarks/mock_server.py in a separate process, runs the full
+scraper against it with the HTTP cache and the per-host rate limit
+disabled, and reports throughput, latency percentiles, peak memory and CPU
+time.
+
+    python benchmarks/bench_crawl.py --books 6000 --latency-ms 20 [--json results.json]
+
+With --revalidate the crawl runs twice with an HTTP cache, and every cached
+page is made stale in between. The second run must revalidate each page
+(304 Not Modified) instead of downloading it again.
+
+Extra scraper options can follow a `--`, e.g. `-- --parser html.parser --concurrency 20`.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import resource
+import socket
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import async_scraper
+from mock_server import add_server_arguments, serve
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 10.0):
+    """Block until the mock server accepts connections."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Mock server did not start on port {port}")
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process and its children, in MB."""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    usage = max(usage, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == 'darwin' else usage / 1024
+
+
+def expire_cache(cache: Path):
+    """Make every cached response stale, so the next crawl revalidates it."""
+    conn = sqlite3.connect(cache)
+    with conn:
+        conn.execute("UPDATE responses SET fetched_at = 0")
+    conn.close()
+
+
+def run_crawl(base_url: str, workdir: Path, scraper_args, cache: Path = None) -> dict:
+    """Run the scraper once and return its measurements."""
+    workdir.mkdir(exist_ok=True)
+    output = workdir / 'books.csv'
+    metrics_path = workdir / 'metrics.json'
+    args = async_scraper.parse_args([
+        '--base-url', base_url,
+        '--output', str(output),
+        '--metrics-json', str(metrics_path),
+        *(['--cache', str(cache)] if cache else ['--no-cache']),
+        '--rate', '0',
+        '--columnar', 'none',
+        *scraper_args,
+    ])
+
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    asyncio.run(async_scraper.main(args))
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    with open(output, encoding='utf-8') as f:
+        books = sum(1 for _ in f) - 1
+    metrics = json.loads(metrics_path.read_text(encoding='utf-8'))
+    responses = metrics['counters'].get('http_responses_total', {})
+    requests = sum(responses.values())
+    stages = {labels.split('=', 1)[1]: histogram
+              for labels, histogram in metrics['histograms'].get('stage_seconds', {}).items()}
+
+    return {
+        'books': books,
+        'requests': int(requests),
+        'wall_seconds': round(elapsed, 2),
+        'cpu_seconds': round(cpu, 2),
+        'requests_per_second': round(requests / elapsed, 1),
+        'books_per_second': round(books / elapsed, 1),
+        'latency_p50_ms': {stage: round(h['p50'] * 1000, 1) for stage, h in stages.items()},
+        'latency_p99_ms': {stage: round(h['p99'] * 1000, 1) for stage, h in stages.items()},
+        'retries': int(sum(metrics['counters'].get('retries_total', {}).values())),
+        'responses_by_status': {labels.split('=', 1)[1]: int(count) for labels, count in responses.items()},
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    argv = sys.argv[1:]
+    scraper_args = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, scraper_args = argv[:split], argv[split + 1:]
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_server_arguments(parser)
+    parser.add_argument('--json', help="also write the results to this JSON file")
+    parser.add_argument('--revalidate', action='store_true',
+                        help="crawl again with every cached page stale and check that all are revalidated")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    port = free_port()
+    server = multiprocessing.Process(
+        target=serve, args=(port, args.books, args.latency_ms, args.jitter_ms, args.error_rate, args.seed,
+                            args.overlap),
+        daemon=True)
+    server.start()
+    try:
+        wait_for_port(port)
+        base_url = f"http://127.0.0.1:{port}"
+        with tempfile.TemporaryDirectory() as tmp:
+            if args.revalidate:
+                cache = Path(tmp) / 'http_cache.sqlite'
+                first = run_crawl(base_url, Path(tmp) / 'first', scraper_args, cache)
+                expire_cache(cache)
+                result = run_crawl(base_url, Path(tmp) / 'second', scraper_args, cache)
+                result['first_run'] = first
+            else:
+                result = run_crawl(base_url, Path(tmp), scraper_args)
+    finally:
+        server.terminate()
+        server.join()
+
+    result['catalogue'] = {'books': args.books, 'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms,
+                           'error_rate': args.error_rate, 'overlap': args.overlap}
+    result['scraper_args'] = scraper_args
+
+    print(f"books          {result['books']} of {args.books}")
+    print(f"requests       {result['requests']} ({result['retries']} retries)")
+    print(f"wall time      {result['wall_seconds']:.2f}s ({result['cpu_seconds']:.2f}s CPU)")
+    print(f"throughput     {result['requests_per_second']:.1f} req/s, {result['books_per_second']:.1f} books/s")
+    for stage in result['latency_p50_ms']:
+        print(f"{stage:<15}p50 {result['latency_p50_ms'][stage]:.0f} ms, p99 {result['latency_p99_ms'][stage]:.0f} ms")
+    print(f"peak RSS       {result['peak_rss_mb']:.1f} MB")
+    if args.revalidate:
+        statuses = result['responses_by_status']
+        print(f"revalidation   {statuses.get('304', 0)} of {result['requests']} responses were 304 Not Modified "
+              f"(first run: {result['first_run']['requests']} requests)")
+        if statuses.get('200') or result['books'] != result['first_run']['books']:
+            print(f"WARNING: the second run downloaded {statuses.get('200', 0)} pages again "
+                  f"and found {result['books']} books instead of {result['first_run']['books']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Memory and time of the insights statistics: whole-frame vs chunked scan.
+
+Writes a synthetic dataset of --books rows (as the scraper would, with the
+'categories' column) to a temporary directory, then computes the
+aggregates of insights_data.py in a fresh process per mode and reports
+wall time and peak RSS (of the main process; chunk workers excluded). The
+modes must agree on the summary.
+
+    python benchmarks/bench_insights.py [--books 500000] [--chunk-rows 100000] [--workers 4]
+"""
+import argparse
+import csv
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from async_scraper import CSV_FIELDNAMES
+from mock_server import Catalogue
+
+BASE_URL = "https://www.ebooks.az"
+
+# Run in a fresh interpreter so each mode's peak RSS is its own
+MEASURE = """
+import json, resource, sys, time
+sys.path.insert(0, {repo!r})
+import insights_data as data
+started = time.perf_counter()
+if {mode!r} == 'chunked':
+    aggregates = data.aggregate_chunks({workers}, {chunk_rows})
+else:
+    df = data.clean_books(data.load_books())
+    aggregates = data.aggregate(df, data.load_book_categories(df))
+elapsed = time.perf_counter() - started
+summary = {{key: str(value) for key, value in data.summarize(aggregates).items()}}
+print(json.dumps({{'seconds': elapsed, 'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  'summary': summary}}))
+"""
+
+
+def write_dataset(path: Path, books: int):
+    catalogue = Catalogue(books)
+    categories = [name for name, size in zip(catalogue.names, catalogue.sizes) for _ in range(size)]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDNAMES)
+        for number, category in enumerate(categories):
+            book = catalogue.book(number)
+            writer.writerow([category, category, book['title'], book['author'], book['publisher'], book['year'],
+                             book['place'], book['pages'], f"{BASE_URL}/az/elibrary/ebook/{book['id']}",
+                             f"{BASE_URL}/image/cover/{book['id']}"])
+
+
+def measure(workdir: Path, mode: str, workers: int, chunk_rows: int) -> dict:
+    code = MEASURE.format(repo=str(REPO), mode=mode, workers=workers, chunk_rows=chunk_rows)
+    output = subprocess.run([sys.executable, '-c', code], cwd=workdir, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=500_000, help="rows in the dataset (default: 500000)")
+    parser.add_argument('--chunk-rows', type=int, default=100_000, help="rows per chunk (default: 100000)")
+    parser.add_argument('--workers', type=int, default=1, help="processes counting chunks (default: 1)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        write_dataset(workdir / 'ebooks_az_all_books_detailed.csv', args.books)
+
+        results = {mode: measure(workdir, mode, args.workers, args.chunk_rows) for mode in ('full', 'chunked')}
+
+    print(f"{args.books} rows, chunks of {args.chunk_rows}, {args.workers} workers")
+    for mode, result in results.items():
+        print(f"{mode:<10}{result['seconds']:>8.2f} s{result['peak_rss_kb'] / 1024:>10.0f} MB peak RSS")
+    if results['full']['summary'] != results['chunked']['summary']:
+        print("WARNING: the chunked summary differs from the full scan")
+
+
+if __name__ == "__main__":
+    main()
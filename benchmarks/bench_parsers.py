@@ -0,0 +1,86 @@
+"""Micro-benchmark of the HTML parser backends on saved pages.
+
+Parses the listing and detail fixtures with every available backend, checks
+that all of them extract the same records, and reports pages/sec. The
+streaming detail extractor (--stream-details) is fed the detail page in
+chunks and stops once its fields are found.
+
+    python benchmarks/bench_parsers.py [--seconds 2]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from parsers import PARSER_BACKENDS, StreamingDetailParser, get_parser
+
+# Same chunk size as the crawler's streaming detail fetch
+CHUNK_SIZE = 8 * 1024
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+BASE_URL = "https://www.ebooks.az"
+
+
+def pages_per_second(parse, html: str, seconds: float) -> float:
+    """Call parse(html) repeatedly for about `seconds` and return calls/sec."""
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        parse(html)
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=2.0, help="time spent per backend and page type")
+    args = parser.parse_args()
+
+    listing_html = (FIXTURES / 'listing.html').read_text(encoding='utf-8')
+    detail_html = (FIXTURES / 'detail.html').read_text(encoding='utf-8')
+
+    reference = None
+    print(f"{'backend':<14}{'listing pages/s':>18}{'detail pages/s':>18}")
+
+    for name in PARSER_BACKENDS:
+        try:
+            backend = get_parser(name)
+        except ValueError as e:
+            print(f"{name:<14}  skipped: {e}")
+            continue
+
+        result = (backend.parse_listing(listing_html, 'philosophy', BASE_URL),
+                  backend.parse_details(detail_html))
+        if reference is None:
+            reference = result
+        elif result != reference:
+            print(f"{name:<14}  WARNING: output differs from {next(iter(PARSER_BACKENDS))}")
+
+        listing_rate = pages_per_second(lambda html: backend.parse_listing(html, 'philosophy', BASE_URL),
+                                        listing_html, args.seconds)
+        detail_rate = pages_per_second(backend.parse_details, detail_html, args.seconds)
+        print(f"{name:<14}{listing_rate:>18.1f}{detail_rate:>18.1f}")
+
+    detail_bytes = detail_html.encode('utf-8')
+
+    def stream_details(page: bytes) -> StreamingDetailParser:
+        extractor = StreamingDetailParser()
+        for start in range(0, len(page), CHUNK_SIZE):
+            extractor.feed_bytes(page[start:start + CHUNK_SIZE])
+            if extractor.done:
+                break
+        return extractor
+
+    extractor = stream_details(detail_bytes)
+    if reference is not None and extractor.details != reference[1]:
+        print(f"{'streaming':<14}  WARNING: details differ from {next(iter(PARSER_BACKENDS))}")
+    detail_rate = pages_per_second(stream_details, detail_bytes, args.seconds)
+    print(f"{'streaming':<14}{'-':>18}{detail_rate:>18.1f}  "
+          f"(read {extractor.bytes_read} of {len(detail_bytes)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
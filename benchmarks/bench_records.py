@@ -0,0 +1,105 @@
+"""Memory per book record, and per book of crawl-wide state.
+
+Builds synthetic books as they come out of the parser and measures with
+tracemalloc:
+  - a plain dict per book (the old record layout) vs a BookRecord
+  - what StreamingCSVWriter keeps per written book (ID and categories)
+  - what BookIndex keeps per book of a previous run in incremental mode
+
+    python benchmarks/bench_records.py [--books 100000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from async_scraper import CSV_FIELDNAMES, BookIndex
+from mock_server import Catalogue
+from output_writer import StreamingCSVWriter
+from records import BookRecord
+
+BASE_URL = "https://www.ebooks.az"
+
+
+def fresh(text: str) -> str:
+    """Return an equal but distinct string, as every parsed page produces."""
+    return text.encode().decode()
+
+
+def parsed_fields(catalogue: Catalogue, number: int, category: str) -> list:
+    """Fields of one book in make_book order, with detail fields."""
+    book = catalogue.book(number)
+    return [fresh(category), fresh(book['title']), fresh(book['author']), fresh(book['publisher']),
+            fresh(book['year']), f"{BASE_URL}/az/elibrary/ebook/{book['id']}",
+            f"{BASE_URL}/image/cover/{book['id']}", fresh(book['place']), fresh(book['pages'])]
+
+
+def measure(build) -> float:
+    """Return the memory still allocated after build() returns, keeping its result alive."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=100_000, help="books to build (default: 100000)")
+    args = parser.parse_args()
+
+    catalogue = Catalogue(args.books)
+    categories = [name for name, size in zip(catalogue.names, catalogue.sizes) for _ in range(size)]
+    n = len(categories)
+
+    def dicts():
+        keys = ['category', 'title', 'author', 'publisher', 'year', 'book_url', 'image_url',
+                'publication_place', 'page_count']
+        return [dict(zip(keys, parsed_fields(catalogue, i, categories[i]))) for i in range(n)]
+
+    def records():
+        result = []
+        for i in range(n):
+            fields = parsed_fields(catalogue, i, categories[i])
+            record = BookRecord(*fields[:7])
+            record.update({'publication_place': fields[7], 'page_count': fields[8]})
+            result.append(record)
+        return result
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'books.csv')
+
+        def writer_state():
+            writer = StreamingCSVWriter(output, CSV_FIELDNAMES)
+            for i in range(n):
+                fields = parsed_fields(catalogue, i, categories[i])
+                writer.write(BookRecord(*fields[:7], publication_place=fields[7], page_count=fields[8]))
+            writer.flush()
+            return writer
+
+        writer_bytes = measure(writer_state)
+        writer = writer_state()
+        writer.close()
+
+        index_bytes = measure(lambda: BookIndex.load(output))
+
+    dict_bytes = measure(dicts)
+    record_bytes = measure(records)
+
+    print(f"{n} books")
+    print(f"{'dict per book':<32}{dict_bytes / n:>8.0f} B")
+    print(f"{'BookRecord per book':<32}{record_bytes / n:>8.0f} B  ({dict_bytes / record_bytes:.1f}x smaller)")
+    print(f"{'writer state per written book':<32}{writer_bytes / n:>8.0f} B")
+    print(f"{'incremental index per book':<32}{index_bytes / n:>8.0f} B")
+
+
+if __name__ == "__main__":
+    main()
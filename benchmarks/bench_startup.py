@@ -0,0 +1,82 @@
+"""Startup cost of generate_insights.py per report subset.
+
+Runs the CLI under ``python -X importtime`` in a temporary directory that
+links the repo's dataset, and reports the time spent importing modules, the
+wall time of the whole run and whether matplotlib was loaded. The first row
+imports everything the CLI can need, for comparison.
+
+    python benchmarks/bench_startup.py [--repeat 3]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+
+# Inputs generate_insights.py reads from the working directory, when present
+INPUTS = ['ebooks_az_all_books_detailed.csv', 'ebooks_az_all_books_detailed.parquet',
+          'ebooks_az_all_books_detailed_categories.csv', 'ebooks_az_all_books_detailed_aggregates.sqlite',
+          'place_aliases.csv']
+
+# Label -> command line after `python -X importtime`
+SCENARIOS = {
+    'import all': ['-c', 'import insights_data, insights_charts, chart_engine'],
+    '--help': [str(REPO / 'generate_insights.py'), '--help'],
+    '--summary-only': [str(REPO / 'generate_insights.py'), '--summary-only'],
+    '--json': [str(REPO / 'generate_insights.py'), '--summary-only', '--json', 'summary.json'],
+    '--charts 02': [str(REPO / 'generate_insights.py'), '--charts', '02', '--workers', '1'],
+}
+
+
+def import_seconds(importtime: str) -> float:
+    """Sum the cumulative times of the top-level imports in -X importtime output."""
+    total = 0
+    for line in importtime.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit() and not name.startswith('  '):
+            total += int(cumulative)
+    return total / 1e6
+
+
+def run(workdir: Path, args) -> dict:
+    env = dict(os.environ, PYTHONPATH=str(REPO))
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True)
+    return {
+        'wall': time.perf_counter() - started,
+        'imports': import_seconds(result.stderr),
+        'matplotlib': re.search(r'\|\s+matplotlib$', result.stderr, re.MULTILINE) is not None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help="runs per scenario, the fastest is kept (default: 3)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        for name in INPUTS:
+            if (REPO / name).exists():
+                (workdir / name).symlink_to(REPO / name)
+        # Warm the bytecode and OS caches so the first scenario is not penalised
+        run(workdir, SCENARIOS['import all'])
+
+        print(f"{'scenario':<16}{'imports':>10}{'wall':>10}  matplotlib")
+        for label, command in SCENARIOS.items():
+            results = [run(workdir, command) for _ in range(args.repeat)]
+            best = min(results, key=lambda result: result['wall'])
+            print(f"{label:<16}{best['imports']:>9.2f}s{best['wall']:>9.2f}s  "
+                  f"{'yes' if best['matplotlib'] else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Local stand-in for ebooks.az serving a synthetic catalogue.
+
+Category listing pages use the same card markup and "Page navigation"
+pagination as the real site, and book pages the same <dt>/<dd> layout, so
+the scraper runs against it unchanged with --base-url. Books are generated
+on the fly from their position in the catalogue, so even 500k books need no
+memory. With --overlap a share of each category's books is also listed at the
+end of the previous category, as on the real site (history / historyaz).
+Cover images are small PNGs; every fifth book gets the same placeholder.
+Pages carry an ETag and Last-Modified, and conditional requests that match
+them are answered 304 Not Modified, as a revalidating HTTP cache expects.
+
+    python benchmarks/mock_server.py --books 6000 --latency-ms 20 --port 8080
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import struct
+import sys
+import zlib
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from async_scraper import CATEGORIES
+
+BOOKS_PER_PAGE = 20
+ID_ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+ID_LENGTH = 7
+
+AUTHORS = ['Mikayılov Şasəddin', 'Ələkbərli Faiq Qəzənfər oğlu', 'Əliyev İlham Heydər oğlu',
+           'Məmmədova Səbinə', 'Hüseynov Rauf', 'Quliyev Elçin', '']
+PUBLISHERS = ['ADPU nəşriyyatı', 'Elm və təhsil', 'Nurlan', 'Azərnəşr', 'Çaşıoğlu', '']
+PLACES = ['Bakı'] * 8 + ['Naxçıvan', 'Gəncə', 'Baku', 'Москва', '']
+
+# Last-Modified of every page; the catalogue never changes while the server runs
+LAST_MODIFIED = 'Mon, 01 Jan 2024 00:00:00 GMT'
+
+# Size of the generated covers in pixels; one in PLACEHOLDER_EVERY books has the placeholder
+COVER_SIZE = (120, 180)
+PLACEHOLDER_EVERY = 5
+
+
+def encode_id(number: int) -> str:
+    """Encode a catalogue position as a 7-character book ID."""
+    chars = []
+    for _ in range(ID_LENGTH):
+        number, digit = divmod(number, len(ID_ALPHABET))
+        chars.append(ID_ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def decode_id(book_id: str) -> int:
+    """Invert encode_id; raises ValueError for unknown IDs."""
+    number = 0
+    for char in book_id:
+        number = number * len(ID_ALPHABET) + ID_ALPHABET.index(char)
+    return number
+
+
+def png(width: int, height: int, rgb) -> bytes:
+    """Encode a single-colour RGB image as PNG."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    row = b'\x00' + bytes(rgb) * width
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(row * height))
+            + chunk(b'IEND', b''))
+
+
+def cover_image(number: int) -> bytes:
+    """Return the cover of a book: its own colour, or the shared placeholder."""
+    if number % PLACEHOLDER_EVERY == 0:
+        return png(*COVER_SIZE, (200, 200, 200))
+    colour = (number * 2654435761) % (1 << 24)
+    return png(*COVER_SIZE, colour.to_bytes(3, 'big'))
+
+
+class Catalogue:
+    """Synthetic catalogue split unevenly across the scraper's categories."""
+
+    def __init__(self, books: int, seed: int = 0, overlap: float = 0.0):
+        rng = random.Random(seed)
+        weights = [rng.paretovariate(1.2) for _ in CATEGORIES]
+        total_weight = sum(weights)
+        self.names = [path.split('/')[-1] for path in CATEGORIES]
+        self.sizes = [max(1, int(books * weight / total_weight)) for weight in weights]
+        self.sizes[0] += books - sum(self.sizes)
+        self.offsets = []
+        offset = 0
+        for size in self.sizes:
+            self.offsets.append(offset)
+            offset += size
+        self.total = offset
+        self.by_name = {name: i for i, name in enumerate(self.names)}
+        # Books of the next category also listed in this one
+        self.extra = [int(self.sizes[(i + 1) % len(self.sizes)] * overlap) for i in range(len(self.sizes))]
+
+    def listed(self, category: int) -> int:
+        return self.sizes[category] + self.extra[category]
+
+    def pages(self, category: int) -> int:
+        return max(1, -(-self.listed(category) // BOOKS_PER_PAGE))
+
+    def listing_position(self, category: int, index: int) -> int:
+        """Return the catalogue position of the index-th book listed in a category."""
+        if index < self.sizes[category]:
+            return self.offsets[category] + index
+        return self.offsets[(category + 1) % len(self.sizes)] + index - self.sizes[category]
+
+    def book(self, number: int) -> dict:
+        """Return the fields of the book at a catalogue position."""
+        rng = random.Random(number)
+        return {
+            'id': encode_id(number),
+            'title': f"Kitab №{number}: {rng.choice(['Tarix', 'Fəlsəfə', 'Ədəbiyyat', 'Elm'])}",
+            'author': rng.choice(AUTHORS),
+            'publisher': rng.choice(PUBLISHERS),
+            'year': str(rng.randint(1950, 2025)),
+            'place': rng.choice(PLACES),
+            'pages': str(rng.randint(40, 900)),
+        }
+
+
+def render_listing(catalogue: Catalogue, category: int, page: int, host: str) -> str:
+    """Render one category listing page with its cards and pagination."""
+    first = (page - 1) * BOOKS_PER_PAGE
+    last = min(catalogue.listed(category), first + BOOKS_PER_PAGE)
+    path = CATEGORIES[category]
+
+    cards = []
+    for index in range(first, last):
+        book = catalogue.book(catalogue.listing_position(category, index))
+        url = f"http://{host}/az/elibrary/ebook/{book['id']}"
+        cards.append(f'''<div class="col-md-6 col-lg-4 d-flex">
+  <div class="card mb-5 border-0 shadow-lg p-4 w-100">
+    <a href="{url}"><img class="img-fluid mx-auto d-block" src="/image/cover/{book['id']}" alt="cover"></a>
+    <div class="card-body">
+      <h5 class="card-title">{book['title']}</h5>
+      <ul class="list-group list-group-flush">
+        <li class="list-group-item text-muted"><i class="fa fa-user"></i> {book['author']}</li>
+        <li class="list-group-item text-muted"><i class="fa fa-building"></i> {book['publisher']}</li>
+        <li class="list-group-item text-muted"><i class="fa fa-calendar"></i> {book['year']}</li>
+      </ul>
+      <a class="btn btn-outline-primary mt-3" href="{url}">Ətraflı</a>
+    </div>
+  </div>
+</div>''')
+
+    # Like the real site: a window around the current page plus the last page
+    total_pages = catalogue.pages(category)
+    shown = sorted({1, total_pages} | set(range(max(1, page - 2), min(total_pages, page + 2) + 1)))
+    links = ''.join(f'<li class="page-item"><a class="page-link" href="{path}?page={n}">{n}</a></li>'
+                    for n in shown)
+    nav = f'<nav aria-label="Page navigation"><ul class="pagination">{links}</ul></nav>' if total_pages > 1 else ''
+
+    return f'''<!DOCTYPE html>
+<html lang="az"><head><meta charset="utf-8"><title>{catalogue.names[category]}</title>
+<link rel="stylesheet" href="/css/bootstrap.min.css"></head>
+<body><header class="navbar"><a class="navbar-brand" href="/az">ebooks.az</a></header>
+<main class="container py-5"><div class="row">
+{''.join(cards)}
+</div>
+{nav}
+</main><footer class="footer">&copy; 2025</footer></body></html>'''
+
+
+def render_detail(book: dict) -> str:
+    """Render a book page with its <dt>/<dd> details."""
+    rows = [('Müəllif:', book['author']), ('Sərlövhə:', book['title']), ('Nəşriyyat:', book['publisher']),
+            ('Nəşr ili:', book['year']), ('Nəşr yeri:', book['place']), ('Səhifə:', book['pages']),
+            ('Dil:', 'Azərbaycan')]
+    dl = ''.join(f'<dt class="col-sm-4">{label}</dt><dd class="col-sm-8">{value}</dd>' for label, value in rows)
+    return f'''<!DOCTYPE html>
+<html lang="az"><head><meta charset="utf-8"><title>{book['title']}</title></head>
+<body><header class="navbar"><a class="navbar-brand" href="/az">ebooks.az</a></header>
+<main class="container py-5"><div class="row">
+<div class="col-md-4"><img class="img-fluid" src="/image/cover/{book['id']}"></div>
+<div class="col-md-8"><h3>{book['title']}</h3><dl class="row">{dl}</dl>
+<p>{'Kitab haqqında qısa məlumat. ' * 20}</p></div>
+</div></main><footer class="footer">&copy; 2025</footer></body></html>'''
+
+
+def page_response(request: web.Request, html: str) -> web.Response:
+    """Answer with the page and its validators, or 304 if the client's copy matches."""
+    etag = '"' + hashlib.sha1(html.encode('utf-8')).hexdigest() + '"'
+    headers = {'ETag': etag, 'Last-Modified': LAST_MODIFIED}
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        # If-Modified-Since is ignored when If-None-Match is sent (RFC 9110)
+        not_modified = if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+    else:
+        try:
+            since = parsedate_to_datetime(request.headers.get('If-Modified-Since', ''))
+            not_modified = since >= parsedate_to_datetime(LAST_MODIFIED)
+        except (TypeError, ValueError):
+            not_modified = False
+    if not_modified:
+        return web.Response(status=304, headers=headers)
+    return web.Response(text=html, content_type='text/html', headers=headers)
+
+
+def create_app(books: int = 6000, latency_ms: float = 20, jitter_ms: float = 10,
+               error_rate: float = 0.0, seed: int = 0, overlap: float = 0.0) -> web.Application:
+    """Build the mock site.
+
+    Every response is delayed by latency_ms plus up to jitter_ms, and a
+    share error_rate of requests is answered with 503 or 429 (Retry-After: 1).
+    """
+    catalogue = Catalogue(books, seed, overlap)
+    rng = random.Random(seed)
+
+    @web.middleware
+    async def network(request, handler):
+        await asyncio.sleep((latency_ms + rng.uniform(0, jitter_ms)) / 1000)
+        if error_rate and rng.random() < error_rate:
+            if rng.random() < 0.5:
+                return web.Response(status=429, headers={'Retry-After': '1'})
+            return web.Response(status=503)
+        return await handler(request)
+
+    async def listing(request):
+        category = catalogue.by_name.get(request.match_info['name'])
+        if category is None:
+            raise web.HTTPNotFound()
+        try:
+            page = int(request.query.get('page', 1))
+        except ValueError:
+            page = 1
+        if not 1 <= page <= catalogue.pages(category):
+            page = 1
+        return page_response(request, render_listing(catalogue, category, page, request.host))
+
+    async def detail(request):
+        try:
+            number = decode_id(request.match_info['book_id'])
+        except ValueError:
+            raise web.HTTPNotFound()
+        if number >= catalogue.total:
+            raise web.HTTPNotFound()
+        return page_response(request, render_detail(catalogue.book(number)))
+
+    async def cover(request):
+        try:
+            number = decode_id(request.match_info['book_id'])
+        except ValueError:
+            raise web.HTTPNotFound()
+        if number >= catalogue.total:
+            raise web.HTTPNotFound()
+        return web.Response(body=cover_image(number), content_type='image/png')
+
+    app = web.Application(middlewares=[network])
+    app.router.add_get('/az/category/{name}', listing)
+    app.router.add_get('/az/elibrary/ebook/{book_id}', detail)
+    app.router.add_get('/image/cover/{book_id}', cover)
+    app['catalogue'] = catalogue
+    return app
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    """Options shared by this script and the crawl benchmark."""
+    parser.add_argument('--books', type=int, default=6000, help="catalogue size (default: 6000)")
+    parser.add_argument('--latency-ms', type=float, default=20, help="base response latency (default: 20)")
+    parser.add_argument('--jitter-ms', type=float, default=10, help="extra random latency (default: 10)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of 429/503 responses (default: 0)")
+    parser.add_argument('--seed', type=int, default=0, help="catalogue and error seed (default: 0)")
+    parser.add_argument('--overlap', type=float, default=0.0,
+                        help="share of books also listed in a second category (default: 0)")
+
+
+def serve(port: int, books: int, latency_ms: float, jitter_ms: float, error_rate: float, seed: int,
+          overlap: float = 0.0):
+    """Run the mock site until interrupted."""
+    app = create_app(books, latency_ms, jitter_ms, error_rate, seed, overlap)
+    web.run_app(app, host='127.0.0.1', port=port, access_log=None, print=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_server_arguments(parser)
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+    print(f"Serving {args.books} books on http://127.0.0.1:{args.port}")
+    serve(args.port, args.books, args.latency_ms, args.jitter_ms, args.error_rate, args.seed, args.overlap)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import sqlite3
+from typing import Dict, List, Optional
+
+from output_writer import CATEGORY_SEPARATOR, book_key, links_path
+
+logger = logging.getLogger(__name__)
+
+# Columns of the books table, as in the CSV
+BOOK_COLUMNS = ['book_id', 'category', 'categories', 'title', 'author', 'publisher', 'year', 'publication_place',
+                'page_count', 'book_url', 'image_url']
+
+# Rows inserted per transaction while building
+BUILD_BATCH_ROWS = 10_000
+
+# Results returned by find() unless a limit is given
+DEFAULT_LIMIT = 50
+
+
+def catalogue_path(csv_filename: str) -> str:
+    """Return the catalogue index built next to a CSV."""
+    root, _ = os.path.splitext(csv_filename)
+    return f"{root}_catalogue.sqlite"
+
+
+def year_number(value: str) -> Optional[int]:
+    """Return a plain year as an int, or None for '', '2010-2012' and the like."""
+    value = (value or '').strip()
+    return int(value) if value.isascii() and value.isdigit() else None
+
+
+def fts_phrase(text: str) -> str:
+    """Quote text as one FTS5 phrase whose last word may be a prefix."""
+    return '"' + ' '.join(text.split()).replace('"', '""') + '" *'
+
+
+def build_catalogue_index(csv_filename: str, path: str = None) -> str:
+    """Build the searchable catalogue of a finished CSV and its link table.
+
+    The index is written to a temporary file and moved over ``path``, so
+    readers never see a half-built catalogue.
+    """
+    path = path or catalogue_path(csv_filename)
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript("""
+        PRAGMA journal_mode = OFF;
+        PRAGMA synchronous = OFF;
+        CREATE TABLE books (
+            id INTEGER PRIMARY KEY,
+            book_id TEXT NOT NULL UNIQUE,
+            category TEXT,
+            categories TEXT,
+            title TEXT,
+            author TEXT,
+            publisher TEXT,
+            year TEXT,
+            publication_place TEXT,
+            page_count TEXT,
+            book_url TEXT,
+            image_url TEXT,
+            year_number INTEGER
+        );
+        CREATE TABLE book_categories (
+            category TEXT NOT NULL,
+            book_id TEXT NOT NULL,
+            PRIMARY KEY (category, book_id)
+        ) WITHOUT ROWID;
+        CREATE VIRTUAL TABLE books_fts USING fts5(
+            title, author, publisher,
+            content='books', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        );
+    """)
+
+    link_file = links_path(csv_filename)
+    has_links = os.path.exists(link_file)
+    insert_book = (f"INSERT OR IGNORE INTO books ({', '.join(BOOK_COLUMNS)}, year_number) "
+                   f"VALUES ({', '.join('?' * (len(BOOK_COLUMNS) + 1))})")
+    insert_link = "INSERT OR IGNORE INTO book_categories VALUES (?, ?)"
+    rows = 0
+    with open(csv_filename, newline='', encoding='utf-8') as f:
+        books, links = [], []
+        for row in csv.DictReader(f):
+            category, book_id = book_key(row)
+            books.append((book_id, *(row.get(column) or '' for column in BOOK_COLUMNS[1:]), year_number(row['year'])))
+            if not has_links:
+                # Without a link table, each row lists its own categories
+                links.extend((name, book_id) for name in (row.get('categories') or category).split(CATEGORY_SEPARATOR))
+            if len(books) >= BUILD_BATCH_ROWS:
+                with conn:
+                    conn.executemany(insert_book, books)
+                    conn.executemany(insert_link, links)
+                rows += len(books)
+                books, links = [], []
+        with conn:
+            conn.executemany(insert_book, books)
+            conn.executemany(insert_link, links)
+        rows += len(books)
+
+    if has_links:
+        with open(link_file, newline='', encoding='utf-8') as f, conn:
+            conn.executemany(insert_link, ((row['category'], row['book_id']) for row in csv.DictReader(f)))
+
+    # Indexes are created after loading, which is faster than maintaining them row by row
+    conn.executescript("""
+        INSERT INTO books_fts (books_fts) VALUES ('rebuild');
+        CREATE INDEX books_year ON books (year_number);
+        CREATE INDEX book_categories_book ON book_categories (book_id);
+        ANALYZE;
+    """)
+    conn.close()
+    os.replace(tmp_path, path)
+    logger.info(f"Catalogue index of {rows} books written to {path}")
+    return path
+
+
+class CatalogueIndex:
+    """Read-only queries on a catalogue index built by ``build_catalogue_index``.
+
+    Books are looked up by ID through the primary key, filtered by category
+    and year through B-tree indexes, and searched by title, author and
+    publisher through an FTS5 table (case- and diacritic-insensitive).
+    Results are dicts with the CSV columns; ``categories`` lists every
+    category of the book.
+    """
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.path = path
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        self.conn.row_factory = sqlite3.Row
+
+    def book(self, row: sqlite3.Row) -> Dict[str, str]:
+        return {column: row[column] for column in BOOK_COLUMNS}
+
+    def get(self, book_id: str) -> Optional[Dict[str, str]]:
+        """Return the book with this ID, or None."""
+        row = self.conn.execute(f"SELECT {', '.join(BOOK_COLUMNS)} FROM books WHERE book_id = ?",
+                                (book_id,)).fetchone()
+        return self.book(row) if row else None
+
+    def find(self, text: str = None, author_prefix: str = None, category: str = None, year_from: int = None,
+             year_to: int = None, limit: int = DEFAULT_LIMIT) -> List[Dict[str, str]]:
+        """Return books matching every given filter.
+
+        ``text`` matches words of the title, author or publisher (the last
+        word as a prefix), and ``author_prefix`` the beginning of the author's
+        name. Text matches come best first, other results in title order.
+        """
+        joins, conditions, params = [], [], []
+        order = "books.title"
+        match = []
+        if text and text.strip():
+            match.append(f"{{title author publisher}} : {fts_phrase(text)}")
+        if author_prefix and author_prefix.strip():
+            match.append(f"author : ^ {fts_phrase(author_prefix)}")
+        if match:
+            joins.append("JOIN books_fts ON books_fts.rowid = books.id")
+            conditions.append("books_fts MATCH ?")
+            params.append(' AND '.join(match))
+            order = "books_fts.rank"
+        if category:
+            joins.append("JOIN book_categories ON book_categories.book_id = books.book_id")
+            conditions.append("book_categories.category = ?")
+            params.append(category)
+        if year_from is not None:
+            conditions.append("books.year_number >= ?")
+            params.append(year_from)
+        if year_to is not None:
+            conditions.append("books.year_number <= ?")
+            params.append(year_to)
+
+        query = f"SELECT {', '.join(f'books.{column}' for column in BOOK_COLUMNS)} FROM books {' '.join(joins)}"
+        if conditions:
+            query += f" WHERE {' AND '.join(conditions)}"
+        query += f" ORDER BY {order} LIMIT ?"
+        params.append(limit)
+        return [self.book(row) for row in self.conn.execute(query, params)]
+
+    def categories(self) -> Dict[str, int]:
+        """Return the number of books per category."""
+        return dict(self.conn.execute(
+            "SELECT category, COUNT(*) FROM book_categories GROUP BY category ORDER BY category").fetchall())
+
+    def close(self):
+        self.conn.close()
+
+
+def print_books(books: List[Dict[str, str]], as_json: bool):
+    for book in books:
+        if as_json:
+            print(json.dumps(book, ensure_ascii=False))
+        else:
+            print(f"{book['book_id']}\t{book['year']}\t{book['author']}\t{book['title']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the ebooks.az catalogue index")
+    parser.add_argument('--output', default='ebooks_az_all_books_detailed.csv',
+                        help="scraped CSV the index belongs to (default: ebooks_az_all_books_detailed.csv)")
+    parser.add_argument('--json', action='store_true', help="print books as JSON lines")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('build', help="(re)build the index from the CSV")
+
+    search = commands.add_parser('search', help="find books by text, author, category and year")
+    search.add_argument('text', nargs='?', help="words of the title, author or publisher")
+    search.add_argument('--author', help="beginning of the author's name")
+    search.add_argument('--category', help="category name, e.g. historyaz")
+    search.add_argument('--from', dest='year_from', type=int, help="first publication year")
+    search.add_argument('--to', dest='year_to', type=int, help="last publication year")
+    search.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help=f"results (default: {DEFAULT_LIMIT})")
+
+    get = commands.add_parser('get', help="look up books by ID")
+    get.add_argument('book_ids', nargs='+')
+
+    commands.add_parser('categories', help="list categories and their number of books")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'build':
+        build_catalogue_index(args.output)
+        return
+
+    index = CatalogueIndex(catalogue_path(args.output))
+    try:
+        if args.command == 'search':
+            print_books(index.find(args.text, args.author, args.category, args.year_from, args.year_to, args.limit),
+                        args.json)
+        elif args.command == 'get':
+            books = [index.get(book_id) for book_id in args.book_ids]
+            for book_id, book in zip(args.book_ids, books):
+                if book is None:
+                    logger.warning(f"No book with ID {book_id}")
+            print_books([book for book in books if book], args.json)
+        elif args.command == 'categories':
+            for category, books in index.categories().items():
+                print(f"{category}\t{books}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import hashlib
+import inspect
+import json
+import logging
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import matplotlib
+
+# Render off-screen; must be selected before pyplot is imported anywhere
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Chart file name -> hash of the inputs it was last rendered from, kept next to the charts
+CACHE_MANIFEST = '.chart_cache.json'
+
+# Bump to re-render every chart, e.g. after upgrading matplotlib
+ENGINE_VERSION = 1
+
+
+class ChartTask:
+    """A chart rendered from named aggregates.
+
+    ``render`` is called as ``render(path, style, **inputs)`` with the
+    aggregates named in ``inputs``; it must be a module-level function so it
+    can run in a worker process.
+    """
+
+    def __init__(self, filename: str, render: Callable, inputs: List[str], style: Dict):
+        self.filename = filename
+        self.render = render
+        self.inputs = inputs
+        self.style = style
+
+    @property
+    def name(self) -> str:
+        return Path(self.filename).stem
+
+    def cache_key(self, aggregates: Dict) -> str:
+        """Hash the chart's inputs, style and drawing code."""
+        digest = hashlib.sha256()
+        digest.update(f"{ENGINE_VERSION}:{self.filename}".encode())
+        digest.update(repr(sorted(self.style.items())).encode())
+        digest.update(inspect.getsource(self.render).encode())
+        for name in self.inputs:
+            digest.update(name.encode())
+            digest.update(fingerprint(aggregates[name]))
+        return digest.hexdigest()
+
+
+class ChartRegistry:
+    """Charts in registration order; ``chart`` is the decorator that registers one."""
+
+    def __init__(self):
+        self.tasks: List[ChartTask] = []
+
+    def chart(self, filename: str, inputs: List[str], **style):
+        def register(render: Callable) -> Callable:
+            self.tasks.append(ChartTask(filename, render, inputs, style))
+            return render
+        return register
+
+
+def fingerprint(value) -> bytes:
+    """Return bytes that change whenever an aggregate's data changes."""
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        # Labels are hashed separately so a renamed column or index changes the key
+        labels = [list(value.index.names), value.index.dtype.name if isinstance(value, pd.Series) else None]
+        if isinstance(value, pd.DataFrame):
+            labels += [list(map(str, value.columns)), list(value.columns.names)]
+        hashed = pd.util.hash_pandas_object(value, index=True).to_numpy()
+        return repr(labels).encode() + hashed.tobytes()
+    if isinstance(value, np.ndarray):
+        return value.dtype.str.encode() + repr(value.shape).encode() + value.tobytes()
+    return pickle.dumps(value)
+
+
+def load_manifest(output_dir: Path) -> Dict[str, str]:
+    path = output_dir / CACHE_MANIFEST
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except ValueError:
+        logger.warning(f"Ignoring unreadable chart cache {path}")
+        return {}
+
+
+def save_manifest(output_dir: Path, manifest: Dict[str, str]):
+    path = output_dir / CACHE_MANIFEST
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding='utf-8')
+    tmp.replace(path)
+
+
+def render_task(task: ChartTask, path: str, inputs: Dict):
+    """Draw one chart; runs in a worker process or inline."""
+    task.render(path, task.style, **inputs)
+
+
+def run_inline(function: Callable, *args) -> Optional[Exception]:
+    """Call a render in this process; returns the error instead of raising, like a pool future."""
+    try:
+        function(*args)
+        return None
+    except Exception as e:
+        return e
+
+
+def render_charts(tasks: List[ChartTask], aggregates: Dict, output_dir: Path, workers: int = None,
+                  force: bool = False, initializer: Callable = None) -> Dict[str, str]:
+    """Render every chart whose inputs changed since it was last written.
+
+    Charts are drawn in a process pool; ``initializer`` runs in each worker
+    (and before inline renders) to apply global plot settings.
+
+    Returns each chart's outcome: 'cached', 'rendered' or 'failed'.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    outcome = {task.name: 'cached' for task in tasks}
+    pending = []
+    for task in tasks:
+        key = task.cache_key(aggregates)
+        if force or manifest.get(task.filename) != key or not (output_dir / task.filename).exists():
+            pending.append((task, key))
+
+    def submit(run):
+        return [(task, key, run(render_task, task, str(output_dir / task.filename),
+                                {name: aggregates[name] for name in task.inputs}))
+                for task, key in pending]
+
+    if len(pending) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=min(workers or len(pending), len(pending)),
+                                 initializer=initializer) as pool:
+            jobs = submit(pool.submit)
+            results = [(task, key, future.exception()) for task, key, future in jobs]
+    else:
+        if initializer and pending:
+            initializer()
+        results = submit(run_inline)
+
+    for task, key, error in results:
+        if error is None:
+            manifest[task.filename] = key
+            outcome[task.name] = 'rendered'
+        else:
+            manifest.pop(task.filename, None)
+            outcome[task.name] = 'failed'
+            logger.error(f"Rendering {task.filename} failed: {type(error).__name__}: {error}")
+
+    save_manifest(output_dir, manifest)
+    return outcome
@@ -0,0 +1,97 @@
+import csv
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Columns stored dictionary-encoded (read back by pandas as 'category' dtype)
+DICTIONARY_COLUMNS = ['category', 'publisher', 'publication_place']
+
+# Numeric columns and their Arrow integer types; anything not a plain
+# integer (empty, '2010-2012', '366 s.') or out of the type's range becomes null
+INTEGER_COLUMNS = {'year': 'int16', 'page_count': 'int32'}
+
+# Largest value of each integer type above
+INTEGER_MAX = {'int16': 2 ** 15 - 1, 'int32': 2 ** 31 - 1}
+
+# Rows read from the CSV per batch while converting
+BATCH_ROWS = 50_000
+
+
+def columnar_path(csv_filename: str, fmt: str = 'parquet') -> str:
+    """Return the columnar file written next to a CSV."""
+    suffix = '.parquet' if fmt == 'parquet' else '.feather'
+    return str(Path(csv_filename).with_suffix(suffix))
+
+
+def convert_batch(batch, pa, pc):
+    """Cast a batch of string columns to the typed schema."""
+    columns = []
+    names = []
+    for name, column in zip(batch.schema.names, batch.columns):
+        if name in INTEGER_COLUMNS:
+            trimmed = pc.utf8_trim_whitespace(column)
+            # At most 18 digits always fits int64, so the cast below cannot fail
+            is_integer = pc.match_substring_regex(trimmed, r'^[0-9]{1,18}$')
+            column = pc.cast(pc.if_else(is_integer, trimmed, pa.scalar(None, pa.string())), pa.int64())
+            in_range = pc.less_equal(column, INTEGER_MAX[INTEGER_COLUMNS[name]])
+            column = pc.if_else(in_range, column, pa.scalar(None, pa.int64()))
+            column = pc.cast(column, INTEGER_COLUMNS[name])
+        elif name in DICTIONARY_COLUMNS:
+            column = pc.dictionary_encode(column)
+        columns.append(column)
+        names.append(name)
+    return pa.RecordBatch.from_arrays(columns, names=names)
+
+
+def write_columnar(csv_filename: str, output_path: str = None, fmt: str = 'parquet') -> str:
+    """Convert the scraped CSV to a typed Parquet or Arrow IPC (Feather) file.
+
+    The CSV is streamed in batches, so the conversion never holds more than
+    one batch of raw strings. Returns the path written, or None if pyarrow is
+    not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        logger.warning("pyarrow is not installed, skipping columnar output")
+        return None
+
+    output_path = output_path or columnar_path(csv_filename, fmt)
+    tmp_path = f"{output_path}.tmp"
+
+    # Read every column as text; types are applied per batch
+    with open(csv_filename, encoding='utf-8') as f:
+        header = next(csv.reader(f))
+    convert_options = pa_csv.ConvertOptions(column_types={name: pa.string() for name in header},
+                                            strings_can_be_null=True)
+    read_options = pa_csv.ReadOptions(block_size=1 << 22)
+
+    reader = pa_csv.open_csv(csv_filename, read_options=read_options, convert_options=convert_options)
+    batches = (convert_batch(batch, pa, pc) for batch in reader)
+
+    rows = 0
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+
+        writer = None
+        for batch in batches:
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, batch.schema, compression='zstd')
+            writer.write_table(pa.Table.from_batches([batch]), row_group_size=BATCH_ROWS)
+            rows += batch.num_rows
+        if writer is not None:
+            writer.close()
+    else:
+        import pyarrow.feather as feather
+
+        # IPC files need one dictionary per column, so unify before writing
+        table = pa.Table.from_batches(list(batches)).unify_dictionaries()
+        feather.write_feather(table, tmp_path, compression='zstd')
+        rows = table.num_rows
+
+    Path(tmp_path).replace(output_path)
+    logger.info(f"Columnar copy saved to {output_path} ({rows} rows)")
+    return output_path
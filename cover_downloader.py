@@ -0,0 +1,357 @@
+import argparse
+import asyncio
+import csv
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional, Tuple
+
+import aiohttp
+
+from crawl_logging import add_logging_arguments, configure_logging
+from crawl_metrics import Metrics
+from flow_control import FetchError, HostRateLimiter, RetryPolicy, MAX_RETRIES
+from output_writer import book_key
+
+logger = logging.getLogger(__name__)
+
+# Directory covers are mirrored to, next to the working directory
+COVERS_DIR = 'covers'
+
+# Cover downloads in flight at once
+COVER_CONCURRENCY = 8
+
+# Bytes read from the socket and written to disk at a time
+COVER_CHUNK_SIZE = 64 * 1024
+
+# Covers larger than this are abandoned mid-stream
+MAX_COVER_BYTES = 20 * 1024 * 1024
+
+# File extension by Content-Type; anything else is stored as .bin
+COVER_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+}
+
+# JPEG quality of generated thumbnails
+THUMBNAIL_QUALITY = 85
+
+
+def make_thumbnail(source: str, target: str, size: int) -> str:
+    """Write a JPEG thumbnail of an image fitting in size x size pixels (runs in a worker process)."""
+    from PIL import Image
+
+    with Image.open(source) as image:
+        image.thumbnail((size, size))
+        tmp_path = f"{target}.tmp"
+        image.convert('RGB').save(tmp_path, 'JPEG', quality=THUMBNAIL_QUALITY)
+    os.replace(tmp_path, target)
+    return target
+
+
+class CoverStore:
+    """Content-addressed cover files with a book ID -> file manifest.
+
+    A cover is stored once under the SHA-256 of its bytes
+    (``objects/ab/ab12...jpg``), so the identical placeholder image served
+    for books without a cover takes a single file. ``covers.sqlite`` records
+    which file each book's cover is, which is how covers already on disk are
+    skipped on later runs.
+    """
+
+    def __init__(self, root: str = COVERS_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.thumbnails_dir = os.path.join(root, 'thumbnails')
+        self.tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(root, 'covers.sqlite'))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS covers (
+                book_id TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                extension TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                url TEXT,
+                fetched_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS covers_sha256 ON covers (sha256)")
+
+    def object_path(self, digest: str, extension: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}{extension}")
+
+    def thumbnail_path(self, digest: str, size: int) -> str:
+        return os.path.join(self.thumbnails_dir, str(size), digest[:2], f"{digest}.jpg")
+
+    def lookup(self, book_id: str) -> Optional[Tuple[str, str]]:
+        """Return (sha256, path) of a book's cover if it is on disk."""
+        row = self.conn.execute("SELECT sha256, extension FROM covers WHERE book_id = ?", (book_id,)).fetchone()
+        if row is None:
+            return None
+        path = self.object_path(*row)
+        return (row[0], path) if os.path.exists(path) else None
+
+    def temp_file(self):
+        """Open a file to stream a download into, on the same filesystem as the objects."""
+        return tempfile.NamedTemporaryFile(dir=self.tmp_dir, suffix='.part', delete=False)
+
+    def commit(self, book_id: str, url: str, tmp_path: str, digest: str, extension: str,
+               size: int) -> Tuple[str, bool]:
+        """Move a finished download into place; returns its path and whether it was new content."""
+        path = self.object_path(digest, extension)
+        is_new = not os.path.exists(path)
+        if is_new:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        else:
+            os.remove(tmp_path)
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO covers VALUES (?, ?, ?, ?, ?, ?)",
+                              (book_id, digest, extension, size, url, time.time()))
+        return path, is_new
+
+    def close(self):
+        self.conn.close()
+
+
+class CoverDownloader:
+    """Mirror cover images on a shared session while the crawl runs.
+
+    Books are queued with ``submit`` and downloaded by ``concurrency``
+    workers, paced by the crawl's per-host rate limiter. Bodies are streamed
+    to disk in chunks and hashed on the way, so a cover is never held in
+    memory. Covers already in the store are skipped. With ``thumbnail_size``
+    and an executor, a thumbnail of every new image is made in the pool.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, store: CoverStore, rate_limiter: HostRateLimiter = None,
+                 retry: RetryPolicy = None, concurrency: int = COVER_CONCURRENCY, thumbnail_size: int = None,
+                 thumbnail_executor: Executor = None, metrics: Metrics = None):
+        self.session = session
+        self.store = store
+        self.rate_limiter = rate_limiter or HostRateLimiter(0, 0)
+        self.retry = retry or RetryPolicy()
+        self.concurrency = concurrency
+        self.thumbnail_size = thumbnail_size
+        self.thumbnail_executor = thumbnail_executor
+        self.metrics = metrics or Metrics()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.workers = []
+        self.thumbnails = set()
+        self.downloaded = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes = 0
+
+        self.metrics.gauge_callback('cover_queue_depth', self.queue.qsize)
+
+    def start(self):
+        self.workers = [asyncio.create_task(self.worker()) for _ in range(self.concurrency)]
+
+    def submit(self, book_id: str, url: str):
+        """Queue a book's cover; returns immediately."""
+        if url:
+            self.queue.put_nowait((book_id, url))
+
+    async def join(self):
+        """Wait for every queued cover and thumbnail, then stop the workers."""
+        await self.queue.join()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        if self.thumbnails:
+            await asyncio.gather(*self.thumbnails, return_exceptions=True)
+
+    async def worker(self):
+        while True:
+            book_id, url = await self.queue.get()
+            try:
+                await self.download(book_id, url)
+            except Exception as e:
+                self.failed += 1
+                logger.error("Error downloading cover %s: %s", url, e)
+            finally:
+                self.queue.task_done()
+
+    async def download(self, book_id: str, url: str):
+        """Download one cover with retries, unless it is already on disk."""
+        if self.store.lookup(book_id):
+            self.skipped += 1
+            self.metrics.inc('covers_total', outcome='skipped')
+            return
+
+        async def request():
+            await self.rate_limiter.acquire(url)
+            started = time.perf_counter()
+            try:
+                await self.fetch(book_id, url)
+            finally:
+                self.metrics.observe('stage_seconds', time.perf_counter() - started, stage='cover_fetch')
+
+        try:
+            await self.retry.run(request, lambda error, delay: self.metrics.inc('retries_total', stage='cover_fetch'))
+        except FetchError as e:
+            self.failed += 1
+            self.metrics.inc('covers_total', outcome='failed')
+            logger.error("Error downloading cover %s: %s", url, e)
+
+    async def fetch(self, book_id: str, url: str):
+        """Stream a cover into the store, raising FetchError on failure."""
+        tmp = None
+        try:
+            async with self.session.get(url) as response:
+                if response.status >= 400:
+                    raise FetchError.from_response(url, response)
+                extension = COVER_EXTENSIONS.get(response.content_type, '.bin')
+
+                digest = hashlib.sha256()
+                size = 0
+                tmp = self.store.temp_file()
+                async for chunk in response.content.iter_chunked(COVER_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > MAX_COVER_BYTES:
+                        raise FetchError(url, f"cover larger than {MAX_COVER_BYTES} bytes", permanent=True)
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                tmp.close()
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            raise FetchError(url, str(e) or type(e).__name__)
+        finally:
+            if tmp is not None and not tmp.closed:
+                tmp.close()
+                os.remove(tmp.name)
+
+        path, is_new = self.store.commit(book_id, url, tmp.name, digest.hexdigest(), extension, size)
+        self.bytes += size
+        if is_new:
+            self.downloaded += 1
+            self.metrics.inc('covers_total', outcome='downloaded')
+            self.make_thumbnail(path, digest.hexdigest())
+        else:
+            self.duplicates += 1
+            self.metrics.inc('covers_total', outcome='duplicate')
+
+    def make_thumbnail(self, path: str, digest: str):
+        """Schedule a thumbnail of a new image in the executor, if thumbnails are enabled."""
+        if not self.thumbnail_size or self.thumbnail_executor is None:
+            return
+        target = self.store.thumbnail_path(digest, self.thumbnail_size)
+        if os.path.exists(target):
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.thumbnail_executor, make_thumbnail, path, target, self.thumbnail_size)
+        self.thumbnails.add(future)
+        future.add_done_callback(self.thumbnail_done)
+
+    def thumbnail_done(self, future: asyncio.Future):
+        self.thumbnails.discard(future)
+        if not future.cancelled() and future.exception():
+            logger.warning(f"Could not make a thumbnail: {future.exception()}")
+
+    def close(self):
+        """Stop the workers, close the store and shut down the thumbnail pool."""
+        for worker in self.workers:
+            worker.cancel()
+        self.store.close()
+        if self.thumbnail_executor:
+            self.thumbnail_executor.shutdown()
+
+    def log_summary(self):
+        logger.info(f"Covers: {self.downloaded} downloaded, {self.duplicates} identical to a stored cover, "
+                    f"{self.skipped} already on disk, {self.failed} failed ({self.bytes / 1e6:.1f} MB)")
+
+
+def thumbnails_supported() -> bool:
+    """Return True if Pillow is installed."""
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_cover_downloader(session: aiohttp.ClientSession, args, rate_limiter: HostRateLimiter,
+                            retry: RetryPolicy, metrics: Metrics) -> Optional[CoverDownloader]:
+    """Create and start the cover stage of a crawl from the command line options, or None without --covers."""
+    if not args.covers:
+        return None
+    thumbnail_size = args.thumbnail_size
+    if thumbnail_size and not thumbnails_supported():
+        logger.warning("Pillow is not installed, skipping thumbnails")
+        thumbnail_size = None
+    executor = ProcessPoolExecutor() if thumbnail_size else None
+    covers = CoverDownloader(session, CoverStore(args.covers_dir), rate_limiter, retry, args.cover_concurrency,
+                             thumbnail_size, executor, metrics)
+    covers.start()
+    logger.info(f"Mirroring covers to {args.covers_dir} with {args.cover_concurrency} downloads in flight"
+                + (f", {thumbnail_size}px thumbnails" if thumbnail_size else ""))
+    return covers
+
+
+def add_cover_arguments(parser: argparse.ArgumentParser):
+    """Cover options shared by the scraper entry points and this script."""
+    parser.add_argument('--covers-dir', default=COVERS_DIR, help=f"cover mirror directory (default: {COVERS_DIR})")
+    parser.add_argument('--cover-concurrency', type=int, default=COVER_CONCURRENCY,
+                        help=f"cover downloads in flight (default: {COVER_CONCURRENCY})")
+    parser.add_argument('--thumbnail-size', type=int,
+                        help="also make JPEG thumbnails fitting in this many pixels (needs Pillow)")
+
+
+async def download_covers(args) -> CoverDownloader:
+    """Mirror the covers of every book in an existing CSV."""
+    connector = aiohttp.TCPConnector(limit_per_host=args.cover_concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60)) as session:
+        covers = create_cover_downloader(session, args, HostRateLimiter(args.rate, args.burst),
+                                         RetryPolicy(args.retries), Metrics())
+        try:
+            with open(args.output, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    covers.submit(book_key(row)[1], row.get('image_url'))
+            await covers.join()
+        finally:
+            covers.close()
+    return covers
+
+
+def main():
+    # Imported here: the scraper imports this module for its cover stage
+    from async_scraper import RATE_LIMIT_BURST, RATE_LIMIT_PER_HOST
+
+    parser = argparse.ArgumentParser(description="Mirror the cover images of a scraped CSV")
+    parser.add_argument('--output', default='ebooks_az_all_books_detailed.csv',
+                        help="scraped CSV whose covers to fetch (default: ebooks_az_all_books_detailed.csv)")
+    parser.add_argument('--rate', type=float, default=RATE_LIMIT_PER_HOST,
+                        help=f"requests per second per host, 0 disables (default: {RATE_LIMIT_PER_HOST})")
+    parser.add_argument('--burst', type=int, default=RATE_LIMIT_BURST,
+                        help=f"token bucket size per host (default: {RATE_LIMIT_BURST})")
+    parser.add_argument('--retries', type=int, default=MAX_RETRIES,
+                        help=f"retries per cover for 429/5xx/timeouts (default: {MAX_RETRIES})")
+    add_cover_arguments(parser)
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    args.covers = True
+    configure_logging(args)
+
+    started = time.monotonic()
+    covers = asyncio.run(download_covers(args))
+    covers.log_summary()
+    logger.info(f"Finished in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
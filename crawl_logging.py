@@ -0,0 +1,140 @@
+import argparse
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Log file in the working directory; --log-file '' disables it
+LOG_FILE = 'scraper.log'
+
+# Line layout of the text format
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Levels selectable with --log-level
+LOG_LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR']
+
+# Warnings and errors let through per call site and window; the rest are counted and dropped
+REPEATED_ERRORS_PER_WINDOW = 20
+REPEATED_ERRORS_WINDOW = 60.0
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers and jq."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'process': record.processName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        suppressed = getattr(record, 'suppressed', None)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RepeatedErrorFilter(logging.Filter):
+    """Let through at most ``limit`` warnings and errors per call site and window.
+
+    A failing host makes the same log call fire for every URL; past the
+    limit the records are only counted, and the next record let through
+    from that call site says how many were dropped. INFO and below always
+    pass.
+    """
+
+    def __init__(self, limit: int = REPEATED_ERRORS_PER_WINDOW, window: float = REPEATED_ERRORS_WINDOW):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        # Call site -> [window start, records let through, records dropped]
+        self.sites: Dict[tuple, List] = {}
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+        now = time.monotonic()
+        site = self.sites.setdefault((record.pathname, record.lineno), [now, 0, 0])
+        if now - site[0] >= self.window:
+            site[0], site[1] = now, 0
+        if site[1] >= self.limit:
+            site[2] += 1
+            self.suppressed += 1
+            return False
+        site[1] += 1
+        if site[2]:
+            record.msg = f"{record.msg} ({site[2]} similar messages suppressed)"
+            record.suppressed = site[2]
+            site[2] = 0
+        return True
+
+
+def add_logging_arguments(parser: argparse.ArgumentParser):
+    """Logging options shared by the scraper entry points."""
+    parser.add_argument('--log-level', choices=LOG_LEVELS, default='INFO', help="minimum level logged (default: INFO)")
+    parser.add_argument('--log-file', default=LOG_FILE, help=f"log file, '' for none (default: {LOG_FILE})")
+    parser.add_argument('--log-format', choices=['text', 'json'], default='text',
+                        help="log file format, 'json' for one JSON object per line (default: text)")
+    parser.add_argument('--log-error-limit', type=int, default=REPEATED_ERRORS_PER_WINDOW,
+                        help=f"warnings and errors per call site and {REPEATED_ERRORS_WINDOW:.0f}s, "
+                             f"0 for no limit (default: {REPEATED_ERRORS_PER_WINDOW})")
+
+
+def configure_logging(args: argparse.Namespace) -> Callable[[], None]:
+    """Send log records through a queue to a background thread that writes them.
+
+    Logging calls on the event loop only put the record on a queue; the
+    console and file handlers run on the listener's thread. Replaces any
+    handlers already on the root logger (e.g. inherited by a forked worker).
+
+    Returns the function that stops the listener after writing out the queued
+    records; it also runs at exit, which worker processes do not reach.
+    """
+    level = getattr(logging, args.log_level)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    handlers[0].setFormatter(logging.Formatter(LOG_FORMAT))
+    if args.log_file:
+        file_handler = logging.FileHandler(args.log_file, encoding='utf-8')
+        file_handler.setFormatter(JSONFormatter() if args.log_format == 'json' else logging.Formatter(LOG_FORMAT))
+        handlers.append(file_handler)
+
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    error_filter = None
+    if args.log_error_limit > 0:
+        error_filter = RepeatedErrorFilter(args.log_error_limit)
+        queue_handler.addFilter(error_filter)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(records, *handlers)
+    listener.start()
+    running = True
+
+    def stop():
+        nonlocal running
+        if not running:
+            return
+        running = False
+        if error_filter and error_filter.suppressed:
+            logger.info(f"{error_filter.suppressed} repeated warnings and errors were not logged")
+        listener.stop()
+        for handler in handlers:
+            handler.close()
+
+    atexit.register(stop)
+    return stop
@@ -0,0 +1,243 @@
+import bisect
+import json
+import time
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+import aiohttp
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def make_labels(labels: Dict[str, object]) -> Labels:
+    """Turn keyword labels into a hashable, ordered key."""
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def format_labels(labels: Labels) -> str:
+    """Render labels in Prometheus exposition format."""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket that holds it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + [float('inf')], self.counts):
+            seen += count
+            if seen >= rank:
+                return bound if bound != float('inf') else self.buckets[-1]
+        return self.buckets[-1]
+
+
+class Metrics:
+    """Counters, gauges and latency histograms for a crawl.
+
+    Every series is identified by a name and keyword labels, e.g.
+    ``metrics.observe('stage_seconds', 0.2, stage='detail_fetch')``. Gauges
+    that mirror live state (in-flight requests, cache hit ratio) are read
+    through callbacks registered with ``gauge_callback`` at export time.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.gauges: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.callbacks: Dict[str, Callable[[], float]] = {}
+        self.started = time.monotonic()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        series = self.counters.setdefault(name, {})
+        key = make_labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        self.gauges.setdefault(name, {})[make_labels(labels)] = value
+
+    def gauge_callback(self, name: str, callback: Callable[[], float]):
+        """Register a gauge whose value is read when metrics are exported."""
+        self.callbacks[name] = callback
+
+    def observe(self, name: str, value: float, **labels):
+        series = self.histograms.setdefault(name, {})
+        key = make_labels(labels)
+        if key not in series:
+            series[key] = Histogram()
+        series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observe the duration of a block in a histogram."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def counter_value(self, name: str, **labels) -> float:
+        return self.counters.get(name, {}).get(make_labels(labels), 0)
+
+    def collect_gauges(self) -> Dict[str, Dict[Labels, float]]:
+        """Return stored gauges plus the current values of callback gauges."""
+        gauges = {name: dict(series) for name, series in self.gauges.items()}
+        for name, callback in self.callbacks.items():
+            try:
+                gauges[name] = {(): callback()}
+            except Exception as e:
+                logger.debug(f"Error reading gauge {name}: {e}")
+        return gauges
+
+    def to_prometheus(self) -> str:
+        """Render all series in the Prometheus text exposition format."""
+        lines = []
+        for name, series in sorted(self.counters.items()):
+            lines.append(f"# TYPE scraper_{name} counter")
+            for labels, value in sorted(series.items()):
+                lines.append(f"scraper_{name}{format_labels(labels)} {value:g}")
+
+        for name, series in sorted(self.collect_gauges().items()):
+            lines.append(f"# TYPE scraper_{name} gauge")
+            for labels, value in sorted(series.items()):
+                lines.append(f"scraper_{name}{format_labels(labels)} {value:g}")
+
+        for name, series in sorted(self.histograms.items()):
+            lines.append(f"# TYPE scraper_{name} histogram")
+            for labels, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + [float('inf')], histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                    lines.append(f"scraper_{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"scraper_{name}_sum{format_labels(labels)} {histogram.sum:g}")
+                lines.append(f"scraper_{name}_count{format_labels(labels)} {histogram.count}")
+
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self) -> Dict:
+        """Summarise all series as plain JSON-serialisable data."""
+        def label_key(labels: Labels) -> str:
+            return ','.join(f"{key}={value}" for key, value in labels) or 'total'
+
+        return {
+            'elapsed_seconds': round(time.monotonic() - self.started, 3),
+            'counters': {name: {label_key(labels): value for labels, value in sorted(series.items())}
+                         for name, series in sorted(self.counters.items())},
+            'gauges': {name: {label_key(labels): value for labels, value in sorted(series.items())}
+                       for name, series in sorted(self.collect_gauges().items())},
+            'histograms': {
+                name: {label_key(labels): {
+                    'count': histogram.count,
+                    'sum': round(histogram.sum, 6),
+                    'mean': round(histogram.sum / histogram.count, 6) if histogram.count else 0,
+                    'p50': histogram.quantile(0.5),
+                    'p99': histogram.quantile(0.99),
+                } for labels, histogram in sorted(series.items())}
+                for name, series in sorted(self.histograms.items())
+            },
+        }
+
+    def write_json(self, path: str):
+        """Write the summary to a JSON file."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        logger.info(f"Metrics summary saved to {path}")
+
+    def log_summary(self, name: str = 'stage_seconds'):
+        """Log count, total time and p50/p99 of each series of a histogram."""
+        for labels, histogram in sorted(self.histograms.get(name, {}).items()):
+            label = ','.join(value for _, value in labels)
+            logger.info(f"  {label:<14} {histogram.sum:8.2f}s over {histogram.count} calls "
+                        f"(p50 {histogram.quantile(0.5) * 1000:.0f} ms, p99 {histogram.quantile(0.99) * 1000:.0f} ms)")
+
+
+def create_trace_config(metrics: Metrics) -> aiohttp.TraceConfig:
+    """Hook aiohttp's request tracing into the metrics.
+
+    Records DNS resolution and connection setup times, time to first byte
+    (request start until response headers), responses per HTTP status and
+    bytes downloaded.
+    """
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, ctx, params):
+        ctx.started = time.perf_counter()
+
+    async def on_dns_resolvehost_start(session, ctx, params):
+        ctx.dns_started = time.perf_counter()
+
+    async def on_dns_resolvehost_end(session, ctx, params):
+        metrics.observe('dns_seconds', time.perf_counter() - ctx.dns_started)
+
+    async def on_connection_create_start(session, ctx, params):
+        ctx.connect_started = time.perf_counter()
+
+    async def on_connection_create_end(session, ctx, params):
+        metrics.observe('connect_seconds', time.perf_counter() - ctx.connect_started)
+
+    async def on_connection_reuseconn(session, ctx, params):
+        metrics.inc('connections_reused_total')
+
+    async def on_request_end(session, ctx, params):
+        metrics.observe('ttfb_seconds', time.perf_counter() - ctx.started)
+        metrics.inc('http_responses_total', status=params.response.status)
+
+    async def on_response_chunk_received(session, ctx, params):
+        metrics.inc('bytes_downloaded_total', len(params.chunk))
+
+    async def on_request_exception(session, ctx, params):
+        metrics.inc('http_errors_total', error=type(params.exception).__name__)
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_response_chunk_received.append(on_response_chunk_received)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+async def start_metrics_server(metrics: Metrics, port: int, host: str = '127.0.0.1') -> web.AppRunner:
+    """Serve /metrics (Prometheus text) and /metrics.json while the crawl runs."""
+    async def prometheus(request):
+        return web.Response(text=metrics.to_prometheus(), content_type='text/plain')
+
+    async def summary(request):
+        return web.json_response(metrics.to_dict())
+
+    app = web.Application()
+    app.router.add_get('/metrics', prometheus)
+    app.router.add_get('/metrics.json', summary)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,200 @@
+import asyncio
+import random
+import time
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Retry schedule: attempts per URL and exponential backoff bounds in seconds
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+# Adaptive concurrency window bounds
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 32
+
+
+class FetchError(Exception):
+    """A request that failed, with what is needed to decide on a retry."""
+
+    def __init__(self, url: str, message: str, status: int = None, retry_after: float = None,
+                 permanent: bool = False):
+        super().__init__(message)
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+        # Set for failures that another attempt would only repeat, e.g. an oversized body
+        self.permanent = permanent
+
+    @property
+    def retryable(self) -> bool:
+        """Network errors, timeouts, 429 and 5xx are worth another attempt."""
+        return not self.permanent and (self.status is None or self.status in RETRYABLE_STATUSES)
+
+    @classmethod
+    def from_response(cls, url: str, response) -> 'FetchError':
+        """Build the error for an HTTP error response, keeping its Retry-After."""
+        return cls(url, f"HTTP {response.status} {response.reason}", response.status,
+                   parse_retry_after(response.headers.get('Retry-After')))
+
+
+def parse_retry_after(value: str) -> float:
+    """Return the delay in seconds from a Retry-After header, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, honouring Retry-After."""
+
+    def __init__(self, retries: int = MAX_RETRIES, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP):
+        self.attempts = retries + 1
+        self.base = base
+        self.cap = cap
+
+    def backoff(self, attempt: int, retry_after: float = None) -> float:
+        """Seconds to wait before retry number attempt + 1."""
+        delay = random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.cap))
+        return delay
+
+    async def run(self, request: Callable[[], Awaitable], on_retry: Callable[[FetchError, float], None] = None):
+        """Await ``request()`` until it succeeds, backing off between retryable failures.
+
+        ``on_retry`` is called with the error and the delay before each retry.
+        Raises the last FetchError once it is not retryable or the attempts
+        are used up.
+        """
+        for attempt in range(self.attempts):
+            try:
+                return await request()
+            except FetchError as e:
+                if not e.retryable or attempt + 1 == self.attempts:
+                    raise
+                error = e
+            delay = self.backoff(attempt, error.retry_after)
+            if on_retry:
+                on_retry(error, delay)
+            await asyncio.sleep(delay)
+
+
+class TokenBucket:
+    """Token bucket that paces requests sent to a single host."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and consume it."""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """Keep one token bucket per host so each site gets its own budget."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    async def acquire(self, url: str):
+        """Wait for permission to send a request to the host of url."""
+        if self.rate <= 0:
+            return
+
+        host = urlparse(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, max(1, self.burst))
+            self.buckets[host] = bucket
+
+        await bucket.acquire()
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency window.
+
+    Used as ``async with limiter:`` around each request. Every healthy
+    response widens the window by roughly one slot per window's worth of
+    requests (additive increase); a retryable failure halves it
+    (multiplicative decrease), at most once per window so a burst of errors
+    from requests already in flight only counts once. Responses much slower
+    than the best latency seen hold the window steady.
+    """
+
+    # Latency above this multiple of the baseline counts as congestion
+    LATENCY_TOLERANCE = 3.0
+
+    def __init__(self, initial: int, minimum: int = MIN_CONCURRENCY, maximum: int = MAX_CONCURRENCY):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+        self.baseline_latency = None
+        # Allow the first failure to shrink the window straight away
+        self.requests_since_decrease = int(self.limit)
+        self.increases = 0
+        self.decreases = 0
+
+    async def __aenter__(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def record_success(self, latency: float):
+        """Widen the window after a healthy response."""
+        self.requests_since_decrease += 1
+        if self.baseline_latency is None or latency < self.baseline_latency:
+            self.baseline_latency = latency
+        if latency > self.baseline_latency * self.LATENCY_TOLERANCE:
+            return
+        if self.limit < self.maximum:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.increases += 1
+
+    def record_failure(self):
+        """Halve the window after a throttled or failed request."""
+        self.requests_since_decrease += 1
+        if self.requests_since_decrease <= int(self.limit):
+            return
+        self.limit = max(self.minimum, self.limit / 2)
+        self.requests_since_decrease = 0
+        self.decreases += 1
+        logger.warning(f"Backing off: concurrency window reduced to {int(self.limit)}")
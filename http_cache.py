@@ -0,0 +1,172 @@
+import sqlite3
+import time
+import zlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default location and size cap of the on-disk cache
+CACHE_PATH = 'http_cache.sqlite'
+CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+# How long a cached response is served without revalidation, by URL class.
+# Listing pages change whenever a book is added; detail pages almost never do.
+CACHE_TTLS: List[Tuple[str, int]] = [
+    ('/category/', 6 * 3600),         # Listing pages
+    ('/ebook/', 30 * 24 * 3600),      # Book detail pages
+]
+DEFAULT_TTL = 24 * 3600
+
+# Cache hits whose access times are buffered before being written in one short transaction
+ACCESS_FLUSH_ROWS = 500
+
+
+class CacheEntry:
+    """A cached response body with its validators."""
+
+    def __init__(self, url: str, body: str, etag: str, last_modified: str, fetched_at: float):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def is_fresh(self, ttl: int) -> bool:
+        """Return True while the entry can be served without revalidation."""
+        return time.time() - self.fetched_at < ttl
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers for revalidation."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HTTPCache:
+    """Persistent response cache keyed by URL.
+
+    Bodies are stored zlib-compressed in SQLite together with their ETag and
+    Last-Modified validators. Once the total compressed size exceeds
+    ``max_bytes`` the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES,
+                 ttls: List[Tuple[str, int]] = None, default_ttl: int = DEFAULT_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = CACHE_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        # URL -> last access time, not yet written; a hit never holds a write lock
+        self.accessed: Dict[str, float] = {}
+
+        # WAL and a generous lock timeout let several crawl processes share one cache
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def ttl_for(self, url: str) -> int:
+        """Return the freshness lifetime for a URL based on its class."""
+        for pattern, ttl in self.ttls:
+            if pattern in url:
+                return ttl
+        return self.default_ttl
+
+    def is_fresh(self, url: str) -> bool:
+        """Return True if a URL can be served from the cache without a request."""
+        row = self.conn.execute("SELECT fetched_at FROM responses WHERE url = ?", (url,)).fetchone()
+        return row is not None and time.time() - row[0] < self.ttl_for(url)
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Return the cached entry for a URL, or None."""
+        row = self.conn.execute(
+            "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self.accessed[url] = time.time()
+        if len(self.accessed) >= ACCESS_FLUSH_ROWS:
+            self.flush_access_times()
+        body, etag, last_modified, fetched_at = row
+        return CacheEntry(url, zlib.decompress(body).decode('utf-8'), etag, last_modified, fetched_at)
+
+    def flush_access_times(self):
+        """Write the buffered access times of cache hits in their own transaction."""
+        if not self.accessed:
+            return
+        with self.conn:
+            self.conn.executemany("UPDATE responses SET last_access = ? WHERE url = ?",
+                                  [(accessed, url) for url, accessed in self.accessed.items()])
+        self.accessed.clear()
+
+    def put(self, url: str, body: str, etag: str = None, last_modified: str = None):
+        """Store a response body and its validators, evicting old entries if needed."""
+        data = zlib.compress(body.encode('utf-8'))
+        now = time.time()
+        # Eviction orders by last access, so pending access times go in first
+        self.flush_access_times()
+
+        with self.conn:
+            previous = self.conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            if previous:
+                self.total_bytes -= previous[0]
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (url, body, etag, last_modified, fetched_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, data, etag, last_modified, now, now, len(data))
+            )
+            self.total_bytes += len(data)
+            self.evict()
+
+    def touch(self, url: str):
+        """Mark a cached entry as revalidated (the server answered 304)."""
+        now = time.time()
+        self.accessed.pop(url, None)
+        with self.conn:
+            self.conn.execute("UPDATE responses SET fetched_at = ?, last_access = ? WHERE url = ?", (now, now, url))
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        if self.total_bytes <= self.max_bytes:
+            return
+
+        rows = self.conn.execute("SELECT url, size FROM responses ORDER BY last_access").fetchall()
+        for url, size in rows:
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self.total_bytes -= size
+
+    def hit_ratio(self) -> float:
+        """Share of lookups answered from the cache, fresh or revalidated."""
+        total = self.hits + self.revalidated + self.misses
+        return (self.hits + self.revalidated) / total if total else 0.0
+
+    def close(self):
+        """Flush pending updates and close the database."""
+        self.flush_access_times()
+        self.conn.close()
+        if self.hits + self.revalidated + self.misses:
+            logger.info(f"HTTP cache: {self.hits} fresh hits, {self.revalidated} revalidated (304), "
+                        f"{self.misses} misses ({self.hit_ratio():.1%} served from cache)")
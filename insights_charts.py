@@ -0,0 +1,171 @@
+# Imported before pyplot so charts render with the Agg backend
+from chart_engine import ChartRegistry
+
+import matplotlib.pyplot as plt
+import seaborn as sns
+import numpy as np
+
+from insights_data import MIN_YEAR, MAX_YEAR, RECENT_FROM_YEAR
+
+# Resolution of every chart; part of each chart's cache key
+DPI = 300
+
+charts = ChartRegistry()
+
+
+def setup_style():
+    """Apply the plot settings shared by all charts (run in each render process)."""
+    sns.set_style("whitegrid")
+    plt.rcParams['figure.figsize'] = (12, 6)
+    plt.rcParams['font.size'] = 10
+
+
+def save_chart(path):
+    plt.tight_layout()
+    plt.savefig(path, dpi=DPI, bbox_inches='tight')
+    plt.close()
+
+
+# 1. Top 15 Categories by Book Count (Bar Chart - Horizontal for better readability)
+@charts.chart('01_category_distribution.png', ['category_counts'], palette='viridis', dpi=DPI)
+def plot_category_distribution(path, style, category_counts):
+    plt.figure(figsize=(12, 8))
+    colors = sns.color_palette(style['palette'], len(category_counts))
+    plt.barh(range(len(category_counts)), category_counts.values, color=colors)
+    plt.yticks(range(len(category_counts)), category_counts.index)
+    plt.xlabel('Number of Books', fontsize=12, fontweight='bold')
+    plt.ylabel('Category', fontsize=12, fontweight='bold')
+    plt.title('Top 15 Categories by Number of Books', fontsize=14, fontweight='bold', pad=20)
+    plt.gca().invert_yaxis()
+
+    # Add value labels
+    for i, (idx, value) in enumerate(category_counts.items()):
+        plt.text(value + 20, i, f'{value:,}', va='center', fontweight='bold')
+
+    save_chart(path)
+
+
+# 2. Publication Trends Over Time (Line Chart)
+@charts.chart('02_publication_trends.png', ['yearly_counts'], color='#2E86AB', dpi=DPI)
+def plot_publication_trends(path, style, yearly_counts):
+    plt.figure(figsize=(14, 6))
+    plt.plot(yearly_counts.index, yearly_counts.values, linewidth=2.5, color=style['color'], marker='o', markersize=3)
+    plt.fill_between(yearly_counts.index, yearly_counts.values, alpha=0.3, color=style['color'])
+    plt.xlabel('Year', fontsize=12, fontweight='bold')
+    plt.ylabel('Number of Books Published', fontsize=12, fontweight='bold')
+    plt.title(f'Publication Trends Over Time ({MIN_YEAR}-{MAX_YEAR})', fontsize=14, fontweight='bold', pad=20)
+    plt.grid(True, alpha=0.3)
+
+    # Add trend line
+    z = np.polyfit(yearly_counts.index, yearly_counts.values, 1)
+    p = np.poly1d(z)
+    plt.plot(yearly_counts.index, p(yearly_counts.index), "--", alpha=0.8, color='red', linewidth=2, label='Trend Line')
+    plt.legend()
+
+    save_chart(path)
+
+
+# 3. Top 15 Publishers (Horizontal Bar Chart)
+@charts.chart('03_top_publishers.png', ['publisher_counts'], palette='rocket', dpi=DPI)
+def plot_top_publishers(path, style, publisher_counts):
+    plt.figure(figsize=(12, 8))
+    colors = sns.color_palette(style['palette'], len(publisher_counts))
+    plt.barh(range(len(publisher_counts)), publisher_counts.values, color=colors)
+    plt.yticks(range(len(publisher_counts)), publisher_counts.index, fontsize=9)
+    plt.xlabel('Number of Books', fontsize=12, fontweight='bold')
+    plt.ylabel('Publisher', fontsize=12, fontweight='bold')
+    plt.title('Top 15 Publishers by Number of Books', fontsize=14, fontweight='bold', pad=20)
+    plt.gca().invert_yaxis()
+
+    # Add value labels
+    for i, (idx, value) in enumerate(publisher_counts.items()):
+        plt.text(value + 5, i, f'{value:,}', va='center', fontweight='bold')
+
+    save_chart(path)
+
+
+# 4. Top 15 Authors (Horizontal Bar Chart)
+@charts.chart('04_top_authors.png', ['author_counts'], palette='mako', dpi=DPI)
+def plot_top_authors(path, style, author_counts):
+    plt.figure(figsize=(12, 8))
+    colors = sns.color_palette(style['palette'], len(author_counts))
+    plt.barh(range(len(author_counts)), author_counts.values, color=colors)
+    plt.yticks(range(len(author_counts)), author_counts.index, fontsize=9)
+    plt.xlabel('Number of Books', fontsize=12, fontweight='bold')
+    plt.ylabel('Author', fontsize=12, fontweight='bold')
+    plt.title('Top 15 Most Prolific Authors', fontsize=14, fontweight='bold', pad=20)
+    plt.gca().invert_yaxis()
+
+    # Add value labels
+    for i, (idx, value) in enumerate(author_counts.items()):
+        plt.text(value + 0.5, i, f'{value:,}', va='center', fontweight='bold')
+
+    save_chart(path)
+
+
+# 5. Recent Publication Trends (Last 10 Years - Line Chart)
+@charts.chart('05_recent_trends.png', ['recent_yearly'], color='#06D6A0', dpi=DPI)
+def plot_recent_trends(path, style, recent_yearly):
+    plt.figure(figsize=(12, 6))
+    plt.plot(recent_yearly.index, recent_yearly.values, linewidth=3, color=style['color'], marker='o', markersize=8)
+    plt.fill_between(recent_yearly.index, recent_yearly.values, alpha=0.3, color=style['color'])
+    plt.xlabel('Year', fontsize=12, fontweight='bold')
+    plt.ylabel('Number of Books Published', fontsize=12, fontweight='bold')
+    plt.title(f'Recent Publication Trends ({RECENT_FROM_YEAR}-{MAX_YEAR})', fontsize=14, fontweight='bold', pad=20)
+    plt.grid(True, alpha=0.3)
+
+    # Add value labels
+    for x, y in zip(recent_yearly.index, recent_yearly.values):
+        plt.text(x, y + 10, str(int(y)), ha='center', fontweight='bold')
+
+    save_chart(path)
+
+
+# 6. Page Count Distribution (Histogram)
+@charts.chart('06_page_count_distribution.png', ['page_histogram', 'page_stats'], color='#F72585', dpi=DPI)
+def plot_page_count_distribution(path, style, page_histogram, page_stats):
+    counts, edges = page_histogram
+    mean, median = page_stats
+    plt.figure(figsize=(12, 6))
+    # Drawn from the precomputed bin counts: one weighted sample per bin
+    plt.hist(edges[:-1], bins=edges, weights=counts, color=style['color'], edgecolor='black', alpha=0.7)
+    plt.axvline(mean, color='blue', linestyle='--', linewidth=2, label=f'Mean: {mean:.0f} pages')
+    plt.axvline(median, color='green', linestyle='--', linewidth=2, label=f'Median: {median:.0f} pages')
+    plt.xlabel('Number of Pages', fontsize=12, fontweight='bold')
+    plt.ylabel('Number of Books', fontsize=12, fontweight='bold')
+    plt.title('Distribution of Book Page Counts', fontsize=14, fontweight='bold', pad=20)
+    plt.legend()
+    plt.grid(True, alpha=0.3, axis='y')
+    save_chart(path)
+
+
+# 7. Publication Place Distribution (Top 10)
+@charts.chart('07_publication_places.png', ['place_counts'], palette='crest', dpi=DPI)
+def plot_publication_places(path, style, place_counts):
+    plt.figure(figsize=(12, 6))
+    colors = sns.color_palette(style['palette'], len(place_counts))
+    plt.barh(range(len(place_counts)), place_counts.values, color=colors)
+    plt.yticks(range(len(place_counts)), place_counts.index)
+    plt.xlabel('Number of Books', fontsize=12, fontweight='bold')
+    plt.ylabel('Publication Place', fontsize=12, fontweight='bold')
+    plt.title('Top 10 Publication Places', fontsize=14, fontweight='bold', pad=20)
+    plt.gca().invert_yaxis()
+
+    # Add value labels
+    for i, (idx, value) in enumerate(place_counts.items()):
+        plt.text(value + 20, i, f'{value:,}', va='center', fontweight='bold')
+
+    save_chart(path)
+
+
+# 8. Category-Year Heatmap (Top 10 categories, last 10 years)
+@charts.chart('08_category_year_heatmap.png', ['category_year'], cmap='YlOrRd', dpi=DPI)
+def plot_category_year_heatmap(path, style, category_year):
+    plt.figure(figsize=(14, 8))
+    sns.heatmap(category_year, annot=True, fmt='d', cmap=style['cmap'], cbar_kws={'label': 'Number of Books'},
+                linewidths=0.5)
+    plt.xlabel('Year', fontsize=12, fontweight='bold')
+    plt.ylabel('Category', fontsize=12, fontweight='bold')
+    plt.title(f'Publication Heatmap: Top 10 Categories ({RECENT_FROM_YEAR}-{MAX_YEAR})', fontsize=14,
+              fontweight='bold', pad=20)
+    save_chart(path)
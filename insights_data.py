@@ -0,0 +1,408 @@
+import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from aggregate_store import AggregateStore, aggregates_path
+from output_writer import CATEGORY_SEPARATOR
+
+import pandas as pd
+import numpy as np
+
+CHARTS_DIR = Path('charts')
+
+# Load data
+CSV_FILE = Path('ebooks_az_all_books_detailed.csv')
+PARQUET_FILE = CSV_FILE.with_suffix('.parquet')
+LINKS_FILE = CSV_FILE.with_name(f"{CSV_FILE.stem}_categories.csv")
+AGGREGATES_FILE = Path(aggregates_path(str(CSV_FILE)))
+
+# Spelling variants of publication places and the name each is counted under
+PLACE_ALIASES_FILE = Path('place_aliases.csv')
+
+# Text columns with few distinct values, stored as pandas categoricals
+CATEGORICAL_COLUMNS = ['category', 'author', 'publisher', 'publication_place']
+
+# Columns coerced to numbers; anything that is not a plain number becomes NaN
+NUMBER_COLUMNS = ['year', 'page_count']
+
+# Years outside this range are treated as data entry errors
+MIN_YEAR = 1900
+MAX_YEAR = 2025
+
+# Years shown in the recent trends chart and the category heatmap
+RECENT_FROM_YEAR = 2015
+
+# Page counts outside this range are left out of the page count histogram
+MAX_PAGE_COUNT = 2000
+PAGE_COUNT_BINS = 50
+
+# Rows per chunk when the dataset is counted chunk by chunk (--chunked)
+CHUNK_ROWS = 100_000
+
+# Columns read by the chunked scan
+CHUNK_COLUMNS = ['category', 'categories', 'author', 'publisher', 'year', 'publication_place', 'page_count']
+
+
+def open_aggregates():
+    """Open the aggregate store written by the scraper, or return None if it is missing or stale."""
+    if not AGGREGATES_FILE.exists():
+        return None
+    # Like the Parquet copy, only trust the store if it is at least as new as the CSV
+    if CSV_FILE.exists() and AGGREGATES_FILE.stat().st_mtime < CSV_FILE.stat().st_mtime:
+        print(f"{AGGREGATES_FILE} is older than {CSV_FILE}, ignoring it")
+        return None
+    try:
+        store = AggregateStore(str(AGGREGATES_FILE))
+    except (ValueError, sqlite3.DatabaseError) as e:
+        print(f"Cannot read {AGGREGATES_FILE} ({e}), ignoring it")
+        return None
+    if not store.is_finished():
+        store.close()
+        return None
+    return store
+
+
+def parquet_is_fresh():
+    """Only trust the Parquet file if it is at least as new as the CSV."""
+    return PARQUET_FILE.exists() and (not CSV_FILE.exists()
+                                      or PARQUET_FILE.stat().st_mtime >= CSV_FILE.stat().st_mtime)
+
+
+def load_books():
+    """Load the dataset, preferring the typed Parquet copy written by the scraper."""
+    if parquet_is_fresh():
+        try:
+            print(f"Loading data from {PARQUET_FILE}...")
+            return pd.read_parquet(PARQUET_FILE)
+        except ImportError:
+            print("pyarrow is not installed, falling back to CSV")
+
+    print(f"Loading data from {CSV_FILE}...")
+    return pd.read_csv(CSV_FILE)
+
+
+def iter_chunks(columns, chunk_rows=CHUNK_ROWS):
+    """Yield the given columns of the dataset in frames of at most chunk_rows rows, like load_books()."""
+    if parquet_is_fresh():
+        try:
+            import pyarrow.parquet as pq
+            parquet = pq.ParquetFile(PARQUET_FILE)
+            print(f"Reading {PARQUET_FILE} in chunks of {chunk_rows} rows...")
+            names = [column for column in columns if column in parquet.schema_arrow.names]
+            for batch in parquet.iter_batches(batch_size=chunk_rows, columns=names):
+                yield batch.to_pandas()
+            return
+        except ImportError:
+            print("pyarrow is not installed, falling back to CSV")
+
+    print(f"Reading {CSV_FILE} in chunks of {chunk_rows} rows...")
+    header = pd.read_csv(CSV_FILE, nrows=0).columns
+    yield from pd.read_csv(CSV_FILE, usecols=[column for column in columns if column in header], chunksize=chunk_rows)
+
+
+def load_book_categories(df):
+    """Load the book <-> category link table, one row per category a book is listed in."""
+    if LINKS_FILE.exists():
+        print(f"Loading book categories from {LINKS_FILE}...")
+        return pd.read_csv(LINKS_FILE, dtype=str)
+    # Older datasets have one row per book and category instead
+    return df[['book_id', 'category']]
+
+
+def load_place_aliases():
+    """Load the spelling -> canonical name table for publication places."""
+    if not PLACE_ALIASES_FILE.exists():
+        print(f"{PLACE_ALIASES_FILE} not found, publication places are not normalized")
+        return {}
+    aliases = pd.read_csv(PLACE_ALIASES_FILE, dtype=str, keep_default_na=False)
+    return dict(zip(aliases['variant'].str.strip(), aliases['place'].str.strip()))
+
+
+def remap_categories(column, mapping):
+    """Rename the categories of a categorical column, merging those mapped to the same name.
+
+    Only the distinct values go through the mapping; rows are remapped with
+    one array lookup on the category codes.
+    """
+    old = column.cat.categories
+    new = old.map(lambda value: mapping.get(value, value))
+    merged = new.unique()
+    lookup = merged.get_indexer(new)
+    codes = column.cat.codes.to_numpy()
+    codes = np.where(codes >= 0, lookup[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, merged), index=column.index, name=column.name)
+
+
+def clean_books(df):
+    """Return the cleaned frame every chart reads from.
+
+    Repeated text columns become categoricals (empty strings count as
+    missing), places are normalized with the alias table, and year and page
+    count are numeric. A year mask shared by the charts is added as
+    ``valid_year``.
+    """
+    df = df.copy()
+    # Book ID from the URL, or the title for books without a page (as in the scraper)
+    df['book_id'] = df['book_url'].str.rstrip('/').str.split('/').str[-1].fillna(df['title'])
+
+    # The Parquet copy already stores these as integers
+    for column in NUMBER_COLUMNS:
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+
+    for column in CATEGORICAL_COLUMNS:
+        values = df[column].astype('category')
+        if '' in values.cat.categories:
+            values = values.cat.remove_categories([''])
+        df[column] = values
+
+    # Normalize publication places (consolidate different spellings of Baku and other cities)
+    df['publication_place'] = remap_categories(df['publication_place'], load_place_aliases())
+
+    df['valid_year'] = df['year'].between(MIN_YEAR, MAX_YEAR)
+    return df
+
+
+def rank_counts(counts, n=None):
+    """Return the n largest counts, ties in name order, skipping values with no books."""
+    counts = counts[counts > 0]
+    ranked = pd.DataFrame({'value': counts.index.astype(str), 'books': counts.to_numpy()})
+    ranked = ranked.sort_values(['books', 'value'], ascending=[False, True]).head(n)
+    return pd.Series(ranked['books'].to_numpy(), index=pd.Index(ranked['value'].to_numpy(), dtype=object))
+
+
+def top_values(column, n):
+    """Return the n most frequent values of a column, skipping missing and unused categories."""
+    return rank_counts(column.value_counts(), n)
+
+
+def aggregate(df, book_categories):
+    """Compute everything the charts and the summary read, from the cleaned frame."""
+    years = df.loc[df['valid_year'], ['book_id', 'year']].astype({'year': int})
+    recent = years[years['year'] >= RECENT_FROM_YEAR]
+    pages = df['page_count']
+    pages = pages[pages.notna() & (pages > 0) & (pages < MAX_PAGE_COUNT)]
+
+    top_10_cats = top_values(book_categories['category'], 10).index
+    recent_links = book_categories.merge(recent, on='book_id')
+    heatmap = recent_links[recent_links['category'].isin(top_10_cats)].groupby(['category', 'year']).size()
+
+    return {
+        'total_books': len(df),
+        'valid_year_books': len(years),
+        'year_range': (years['year'].min(), years['year'].max()),
+        'total_categories': book_categories['category'].nunique(),
+        'category_counts': top_values(book_categories['category'], 15),
+        'yearly_counts': years['year'].value_counts().sort_index().rename_axis(None).rename(None),
+        'recent_yearly': recent['year'].value_counts().sort_index().rename_axis(None).rename(None),
+        'publisher_counts': top_values(df['publisher'], 15),
+        'author_counts': top_values(df['author'], 15),
+        'place_counts': top_values(df['publication_place'], 10),
+        'page_histogram': np.histogram(pages, bins=PAGE_COUNT_BINS),
+        'page_stats': (float(pages.mean()), float(pages.median())),
+        'category_year': heatmap.unstack(fill_value=0),
+    }
+
+
+def aggregate_counts(total_books, counts, category_years):
+    """Compute the same aggregates as aggregate() from books per distinct value.
+
+    ``counts`` holds a Series of books per value for 'category', 'year',
+    'publication_place', 'publisher', 'author' and 'page_count' (places as
+    scraped); ``category_years(categories)`` returns (category, year, books)
+    rows of the given categories from RECENT_FROM_YEAR on.
+    """
+    categories = counts['category']
+    years = counts['year'].sort_index()
+    years = years[(years.index >= MIN_YEAR) & (years.index <= MAX_YEAR)]
+
+    # Aliases are applied to the distinct places, so editing place_aliases.csv needs no rebuild
+    places = counts['publication_place']
+    aliases = load_place_aliases()
+    places = places.groupby(places.index.map(lambda place: aliases.get(place, place))).sum()
+
+    pages = counts['page_count'].sort_index()
+    pages = pages[(pages.index > 0) & (pages.index < MAX_PAGE_COUNT)]
+    page_values = pages.index.to_numpy(dtype=float)
+    page_books = pages.to_numpy()
+    bin_counts, edges = np.histogram(page_values, bins=PAGE_COUNT_BINS, weights=page_books)
+    # Median of the expanded values: the middle one, or the mean of the middle two
+    cumulative = page_books.cumsum()
+    total = cumulative[-1] if len(cumulative) else 0
+    middle = page_values[np.searchsorted(cumulative, [(total - 1) // 2, total // 2], side='right')] if total else [np.nan]
+    page_stats = (float((page_values * page_books).sum() / total) if total else np.nan, float(np.mean(middle)))
+
+    top_10_cats = rank_counts(categories, 10).index
+    heatmap = pd.DataFrame(category_years(list(top_10_cats)), columns=['category', 'year', 'books'])
+
+    return {
+        'total_books': total_books,
+        'valid_year_books': int(years.sum()),
+        'year_range': (years.index.min(), years.index.max()),
+        'total_categories': int((categories > 0).sum()),
+        'category_counts': rank_counts(categories, 15),
+        'yearly_counts': years,
+        'recent_yearly': years[years.index >= RECENT_FROM_YEAR],
+        'publisher_counts': rank_counts(counts['publisher'], 15),
+        'author_counts': rank_counts(counts['author'], 15),
+        'place_counts': rank_counts(places, 10),
+        'page_histogram': (bin_counts.astype(np.int64), edges),
+        'page_stats': page_stats,
+        'category_year': heatmap.pivot(index='category', columns='year', values='books').fillna(0).astype(np.int64),
+    }
+
+
+def aggregate_store(store):
+    """Compute the same aggregates as aggregate() from the precomputed counts of an AggregateStore."""
+    def counts(dimension):
+        rows = store.counts(dimension)
+        return pd.Series([books for _, books in rows], index=[value for value, _ in rows], dtype='int64')
+
+    dimensions = ['category', 'year', 'publication_place', 'publisher', 'author', 'page_count']
+    return aggregate_counts(store.total_books(), {dimension: counts(dimension) for dimension in dimensions},
+                            lambda categories: store.category_years(categories, RECENT_FROM_YEAR, MAX_YEAR))
+
+
+def count_values(column):
+    """Books per value of a text column, skipping missing and empty values."""
+    counts = column[column.notna() & (column != '')].value_counts()
+    counts = counts[counts > 0]
+    return pd.Series(counts.to_numpy(), index=counts.index.astype(object))
+
+
+def count_chunk(df):
+    """Count one chunk of raw rows; the counts of all chunks add up to those of the whole dataset.
+
+    Module-level so chunks can be counted in a process pool.
+    """
+    numbers = {column: df[column] if pd.api.types.is_numeric_dtype(df[column])
+               else pd.to_numeric(df[column], errors='coerce') for column in NUMBER_COLUMNS}
+    years = numbers['year']
+    pages = numbers['page_count']
+    valid_years = years[years.between(MIN_YEAR, MAX_YEAR)].astype('int64')
+
+    # A finished CSV lists every category of a book in 'categories'; older ones have a row per category
+    categories = df['category'].astype(object)
+    if 'categories' in df:
+        listed = df['categories'].astype(object)
+        categories = listed.where(listed.notna() & (listed != ''), categories)
+    links = pd.DataFrame({'category': categories.str.split(CATEGORY_SEPARATOR), 'year': years}).explode('category')
+    links = links[links['category'].notna() & (links['category'] != '')]
+    recent = links[links['year'].between(max(RECENT_FROM_YEAR, MIN_YEAR), MAX_YEAR)].astype({'year': 'int64'})
+
+    return {
+        'rows': len(df),
+        'category': count_values(links['category']),
+        'year': valid_years.value_counts().rename_axis(None).rename(None),
+        'publication_place': count_values(df['publication_place']),
+        'publisher': count_values(df['publisher']),
+        'author': count_values(df['author']),
+        'page_count': pages[(pages > 0) & (pages < MAX_PAGE_COUNT)].value_counts().rename_axis(None).rename(None),
+        'category_year': recent.groupby(['category', 'year']).size(),
+    }
+
+
+def merge_counts(totals, counts):
+    """Add the counts of one chunk to the running totals."""
+    if totals is None:
+        return counts
+    return {key: totals[key] + value if key == 'rows' else totals[key].add(value, fill_value=0)
+            for key, value in counts.items()}
+
+
+def aggregate_chunks(workers=None, chunk_rows=CHUNK_ROWS):
+    """Compute the same aggregates as aggregate() without loading the dataset at once.
+
+    Chunks are counted (in a process pool with ``workers`` > 1, at most two
+    per worker in flight) and their per-value counts summed. Memory grows
+    with the number of distinct values, not rows. Page counts are whole
+    numbers below MAX_PAGE_COUNT, so their value counts are a small mergeable
+    summary from which the median is exact.
+    """
+    chunks = iter_chunks(CHUNK_COLUMNS, chunk_rows)
+    totals = None
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(count_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    totals = merge_counts(totals, pending.popleft().result())
+            while pending:
+                totals = merge_counts(totals, pending.popleft().result())
+    else:
+        for chunk in chunks:
+            totals = merge_counts(totals, count_chunk(chunk))
+
+    counts = {key: value.astype('int64') for key, value in totals.items() if key != 'rows'}
+    category_year = counts.pop('category_year')
+
+    def category_years(categories):
+        return [(category, year, books) for (category, year), books in category_year.sort_index().items()
+                if category in categories and year >= RECENT_FROM_YEAR]
+
+    return aggregate_counts(totals['rows'], counts, category_years)
+
+
+def summarize(aggregates):
+    """Pick the headline numbers of the summary from the aggregates."""
+    category_counts = aggregates['category_counts']
+    yearly_counts = aggregates['yearly_counts']
+    recent_yearly = aggregates['recent_yearly']
+    publisher_counts = aggregates['publisher_counts']
+    author_counts = aggregates['author_counts']
+    place_counts = aggregates['place_counts']
+
+    return {
+        'top_category': category_counts.index[0],
+        'top_category_count': category_counts.values[0],
+        'total_categories': aggregates['total_categories'],
+        'most_productive_year': yearly_counts.idxmax(),
+        'most_productive_year_count': yearly_counts.max(),
+        'recent_5yr_avg': yearly_counts.tail(5).mean(),
+        'top_publisher': publisher_counts.index[0] if len(publisher_counts) > 0 else "N/A",
+        'top_publisher_count': publisher_counts.values[0] if len(publisher_counts) > 0 else 0,
+        'top_author': author_counts.index[0] if len(author_counts) > 0 else "N/A",
+        'top_author_count': author_counts.values[0] if len(author_counts) > 0 else 0,
+        'last_year_count': recent_yearly.get(recent_yearly.index.max(), 0) if len(recent_yearly) > 0 else 0,
+        'avg_page_count': aggregates['page_stats'][0],
+        'median_page_count': aggregates['page_stats'][1],
+        'top_publication_place': place_counts.index[0] if len(place_counts) > 0 else "N/A",
+        'top_publication_place_count': place_counts.values[0] if len(place_counts) > 0 else 0,
+    }
+
+
+def write_summary(aggregates, insights):
+    """Print the summary and save it to charts/insights_summary.txt."""
+    year_min, year_max = aggregates['year_range']
+    lines = [
+        f"Total Books Scraped: {aggregates['total_books']:,}",
+        f"Total Categories: {insights['total_categories']}",
+        f"Date Range: {year_min:.0f} - {year_max:.0f}",
+        "",
+        f"Top Category: {insights['top_category']} ({insights['top_category_count']:,} books)",
+        f"Top Publisher: {insights['top_publisher']} ({insights['top_publisher_count']:,} books)",
+        f"Top Author: {insights['top_author']} ({insights['top_author_count']:,} books)",
+        "",
+        f"Most Productive Year: {insights['most_productive_year']:.0f} ({insights['most_productive_year_count']:,} books)",
+        f"Recent 5-Year Average: {insights['recent_5yr_avg']:.1f} books/year",
+        "",
+        f"Average Page Count: {insights['avg_page_count']:.0f} pages",
+        f"Median Page Count: {insights['median_page_count']:.0f} pages",
+        "",
+        f"Top Publication Place: {insights['top_publication_place']} ({insights['top_publication_place_count']:,} books)",
+    ]
+
+    print("\n" + "="*60)
+    print("DATA INSIGHTS SUMMARY")
+    print("="*60)
+    print("\n" + "\n".join(lines))
+    print("\n" + "="*60)
+
+    CHARTS_DIR.mkdir(exist_ok=True)
+    with open(CHARTS_DIR / 'insights_summary.txt', 'w', encoding='utf-8') as f:
+        f.write("="*60 + "\n")
+        f.write("EBOOKS.AZ DATA INSIGHTS SUMMARY\n")
+        f.write("="*60 + "\n\n")
+        f.write("\n".join(lines) + "\n")
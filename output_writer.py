@@ -0,0 +1,311 @@
+import csv
+import json
+import os
+import sys
+import logging
+from typing import Dict, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rows buffered before they are written and fsynced
+FLUSH_BATCH_SIZE = 200
+
+# Separator of the multi-valued 'categories' column
+CATEGORY_SEPARATOR = '|'
+
+# Columns of the book <-> category link table
+LINK_FIELDNAMES = ['book_id', 'category']
+
+
+def get_book_id(book_url: str) -> str:
+    """Return the book ID from a book URL (e.g. .../ebook/9gPKz5Y -> 9gPKz5Y)."""
+    return book_url.rstrip('/').split('/')[-1] if book_url else ""
+
+
+def book_key(book: Dict) -> Tuple[str, str]:
+    """Identify a row by category and book ID, or title for books without a URL."""
+    return book['category'], get_book_id(book['book_url']) or book['title']
+
+
+def links_path(csv_filename: str) -> str:
+    """Return the book <-> category link table written next to a CSV."""
+    root, ext = os.path.splitext(csv_filename)
+    return f"{root}_categories{ext or '.csv'}"
+
+
+def atomic_write_text(path: str, text: str):
+    """Write a small file so readers see either the old or the new content."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CrawlCheckpoint:
+    """Categories and listing pages whose rows are safely on disk.
+
+    A page is recorded once every book on it has been written and flushed,
+    and a category once all of its pages are, so a restarted run can skip
+    them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.categories: Set[str] = set()
+        self.pages: Dict[str, Set[int]] = {}
+
+    @classmethod
+    def load(cls, path: str) -> 'CrawlCheckpoint':
+        """Read a checkpoint file, or start an empty one."""
+        checkpoint = cls(path)
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            checkpoint.categories = set(data.get('categories', []))
+            checkpoint.pages = {name: set(pages) for name, pages in data.get('pages', {}).items()}
+        except FileNotFoundError:
+            pass
+        return checkpoint
+
+    def is_category_done(self, category_name: str) -> bool:
+        """Return True if every page of the category is on disk."""
+        return category_name in self.categories
+
+    def is_page_done(self, category_name: str, page: int) -> bool:
+        """Return True if every book of the listing page is on disk."""
+        return page in self.pages.get(category_name, ())
+
+    def save(self):
+        """Persist the checkpoint atomically."""
+        data = {
+            'categories': sorted(self.categories),
+            'pages': {name: sorted(pages) for name, pages in sorted(self.pages.items())},
+        }
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False))
+
+    def remove(self):
+        """Delete the checkpoint once the run has finished."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class StreamingCSVWriter:
+    """Append rows to a temporary CSV as books are resolved.
+
+    Rows are buffered and written in batches to ``<path>.partial``; each
+    flush is fsynced before the checkpoint is updated, so the checkpoint never
+    claims pages whose rows could be lost. ``close()`` atomically renames the
+    partial file over ``path``. With ``resume`` an existing partial file is
+    appended to and rows already in it are not written again.
+
+    A book listed in several categories gets a single row. Every (book ID,
+    category) pair goes to the link table next to the CSV (see
+    ``links_path``), and ``close()`` fills the row's ``categories`` column
+    with all of its categories and sets ``category`` to the first of them.
+    Both follow ``category_order`` (then name order), not the order in which
+    listings happened to arrive, so reruns give the same rows.
+
+    Books are ``records.BookRecord`` objects. Per book, only its ID and its
+    categories (an interned string) stay in memory after the row is flushed.
+
+    If an ``aggregate_store.AggregateStore`` opened with ``for_writing`` is
+    given, every flushed row and link is added to it too, and it is moved
+    into place with the CSV.
+    """
+
+    def __init__(self, path: str, fieldnames: List[str], batch_size: int = FLUSH_BATCH_SIZE,
+                 resume: bool = False, aggregates=None, category_order: List[str] = None):
+        self.path = path
+        self.partial_path = f"{path}.partial"
+        checkpoint_path = f"{path}.checkpoint.json"
+        self.fieldnames = fieldnames
+        self.batch_size = batch_size
+        self.aggregates = aggregates
+        self.category_rank = {name: rank for rank, name in enumerate(category_order or [])}
+        self.checkpoint = CrawlCheckpoint.load(checkpoint_path) if resume else CrawlCheckpoint(checkpoint_path)
+        self.link_path = links_path(path)
+        self.link_partial_path = f"{self.link_path}.partial"
+        self.buffer = []
+        self.link_buffer: List[Tuple[str, str]] = []
+        self.done_pages: List[Tuple[str, int]] = []
+        self.done_categories: List[str] = []
+        # Categories of each written book joined by CATEGORY_SEPARATOR, the one
+        # its row was written under first
+        self.books: Dict[str, str] = {}
+        self.rows = 0
+        self.duplicates = 0
+
+        if resume and os.path.exists(self.partial_path):
+            self.load_partial()
+            logger.info(f"Resuming {self.partial_path}: {self.rows} rows, "
+                        f"{len(self.checkpoint.categories)} categories already complete")
+            self.file = open(self.partial_path, 'a', newline='', encoding='utf-8')
+            self.writer = csv.DictWriter(self.file, fieldnames=fieldnames)
+            self.link_file = open(self.link_partial_path, 'a', newline='', encoding='utf-8')
+            self.link_writer = csv.writer(self.link_file)
+        else:
+            self.file = open(self.partial_path, 'w', newline='', encoding='utf-8')
+            self.writer = csv.DictWriter(self.file, fieldnames=fieldnames)
+            self.writer.writeheader()
+            self.link_file = open(self.link_partial_path, 'w', newline='', encoding='utf-8')
+            self.link_writer = csv.writer(self.link_file)
+            self.link_writer.writerow(LINK_FIELDNAMES)
+
+    def load_partial(self):
+        """Rebuild the written rows and links from the partial files of an interrupted run."""
+        rows = []
+        with open(self.partial_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                category, book_id = book_key(row)
+                self.books[book_id] = sys.intern(category)
+                # Re-added in case the interruption came between a flush and its aggregate update
+                if self.aggregates:
+                    rows.append(row)
+                    if len(rows) >= self.batch_size:
+                        self.aggregates.add(rows)
+                        rows = []
+        if self.aggregates:
+            self.aggregates.add(rows)
+        self.rows = len(self.books)
+
+        primary_linked = set()
+        links = []
+        if os.path.exists(self.link_partial_path):
+            with open(self.link_partial_path, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    category, book_id = row['category'], row['book_id']
+                    # Rows are fsynced before their links, so this only skips torn writes
+                    if book_id not in self.books:
+                        continue
+                    if self.aggregates:
+                        links.append((category, book_id))
+                    if self.books[book_id].split(CATEGORY_SEPARATOR)[0] == category:
+                        primary_linked.add(book_id)
+                    elif not self.is_written((category, book_id)):
+                        self.add_category(book_id, category)
+        if self.aggregates:
+            self.aggregates.add([], links)
+
+        # Links of rows flushed just before an interruption
+        for book_id, categories in self.books.items():
+            if book_id not in primary_linked:
+                self.link_buffer.append((categories.split(CATEGORY_SEPARATOR)[0], book_id))
+
+    def add_category(self, book_id: str, category: str):
+        """Record another category of a book that already has a row."""
+        self.books[book_id] = sys.intern(f"{self.books[book_id]}{CATEGORY_SEPARATOR}{category}")
+
+    def sorted_categories(self, categories: str) -> str:
+        """Order a book's categories by category_order, then by name."""
+        names = categories.split(CATEGORY_SEPARATOR)
+        names.sort(key=lambda name: (self.category_rank.get(name, len(self.category_rank)), name))
+        return CATEGORY_SEPARATOR.join(names)
+
+    def has_book(self, book_id: str) -> bool:
+        """Return True if a row for the book was already written under any category."""
+        return book_id in self.books
+
+    def is_written(self, key: Tuple[str, str]) -> bool:
+        """Return True if the (category, book ID) listing was already written."""
+        category, book_id = key
+        categories = self.books.get(book_id)
+        if categories is None:
+            return False
+        return categories == category or category in categories.split(CATEGORY_SEPARATOR)
+
+    def write(self, book):
+        """Queue a finished row, or only its category link if the book already has a row."""
+        key = book.key()
+        if self.is_written(key):
+            return
+        self.link_buffer.append(key)
+
+        category, book_id = key
+        if book_id in self.books:
+            self.add_category(book_id, category)
+            self.duplicates += 1
+        else:
+            self.books[book_id] = sys.intern(category)
+            self.buffer.append(book)
+
+        if len(self.link_buffer) >= self.batch_size:
+            self.flush()
+
+    def page_done(self, category_name: str, page: int):
+        """Record a listing page as complete at the next flush."""
+        self.done_pages.append((category_name, page))
+
+    def category_done(self, category_name: str):
+        """Record a category as complete and flush right away."""
+        self.done_categories.append(category_name)
+        self.flush()
+
+    def flush(self):
+        """Write buffered rows and then their links to disk, then advance the checkpoint."""
+        rows = [book.as_row() for book in self.buffer]
+        if rows:
+            self.writer.writerows(rows)
+            self.rows += len(rows)
+            self.buffer = []
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+        links = self.link_buffer
+        if links:
+            self.link_writer.writerows((book_id, category) for category, book_id in links)
+            self.link_buffer = []
+        self.link_file.flush()
+        os.fsync(self.link_file.fileno())
+
+        if self.aggregates and (rows or links):
+            self.aggregates.add(rows, links)
+
+        if self.done_pages or self.done_categories:
+            for category_name, page in self.done_pages:
+                self.checkpoint.pages.setdefault(category_name, set()).add(page)
+            self.checkpoint.categories.update(self.done_categories)
+            self.done_pages = []
+            self.done_categories = []
+            self.checkpoint.save()
+
+    def close(self):
+        """Finish the files, filling in each row's categories, and move them into place."""
+        self.flush()
+        self.file.close()
+        self.link_file.close()
+
+        # The full category list of a book is only known now, so the rows
+        # are copied once more with the 'categories' column set
+        tmp_path = f"{self.path}.tmp"
+        with open(self.partial_path, newline='', encoding='utf-8') as src, \
+                open(tmp_path, 'w', newline='', encoding='utf-8') as dst:
+            writer = csv.DictWriter(dst, fieldnames=self.fieldnames)
+            writer.writeheader()
+            for row in csv.DictReader(src):
+                category, book_id = book_key(row)
+                row['categories'] = self.sorted_categories(self.books.get(book_id, category))
+                row['category'] = row['categories'].split(CATEGORY_SEPARATOR)[0]
+                writer.writerow(row)
+            dst.flush()
+            os.fsync(dst.fileno())
+
+        os.replace(tmp_path, self.path)
+        os.remove(self.partial_path)
+        os.replace(self.link_partial_path, self.link_path)
+        if self.aggregates:
+            self.aggregates.finish(self.rows)
+        self.checkpoint.remove()
+        logger.info(f"Data saved to {self.path} and {self.link_path}"
+                    + (f" ({self.duplicates} repeat listings stored as links only)" if self.duplicates else ""))
+
+    def abort(self):
+        """Flush what we have and keep the partial file for --resume."""
+        self.flush()
+        self.file.close()
+        self.link_file.close()
+        if self.aggregates:
+            self.aggregates.close()
+        logger.warning(f"Run interrupted: {self.rows} rows kept in {self.partial_path}, "
+                       f"resume with --resume")
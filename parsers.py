@@ -0,0 +1,412 @@
+from bs4 import BeautifulSoup, SoupStrainer
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+import codecs
+import logging
+from typing import Dict, List, Tuple
+
+from records import BookRecord
+
+logger = logging.getLogger(__name__)
+
+# Class attribute of a book card on category listing pages
+CARD_CLASS = 'card mb-5 border-0 shadow-lg p-4 w-100'
+LIST_ITEM_CLASS = 'list-group-item text-muted'
+
+# Fields read from the <dt>/<dd> pairs of a book detail page
+DETAIL_LABELS = {
+    'publication_place': 'Nəşr yeri:',
+    'page_count': 'Səhifə:',
+}
+
+
+def make_book(category_name: str, title: str, author: str, publisher: str, year: str,
+              book_url: str, image_url: str, base_url: str) -> BookRecord:
+    """Build a book record from a listing card; place and page count come from the detail page."""
+    if image_url and not image_url.startswith('http'):
+        image_url = urljoin(base_url, image_url)
+
+    return BookRecord(category_name, title, author, publisher, year, book_url, image_url)
+
+
+def max_page_number(links: List[Tuple[str, str]]) -> int:
+    """Return the highest page number from (href, text) pairs of pagination links."""
+    max_page = 1
+
+    for href, text in links:
+        # Try to extract page number from the link href
+        if 'page=' in href:
+            try:
+                page_num = int(href.split('page=')[1].split('&')[0])
+                if page_num > max_page:
+                    max_page = page_num
+            except (ValueError, IndexError):
+                pass
+
+        # Also try to get it from the link text
+        try:
+            page_num = int(text)
+            if page_num > max_page:
+                max_page = page_num
+        except ValueError:
+            continue
+
+    return max_page
+
+
+def match_labels(pairs, labels: Dict[str, str]) -> Dict[str, str]:
+    """Map (dt text, dd text) pairs to fields in a single pass.
+
+    The first <dt> containing a label wins, as the page lists each label once.
+    """
+    details = {field: '' for field in labels}
+    remaining = dict(labels)
+
+    for dt_text, dd_text in pairs:
+        for field, label in list(remaining.items()):
+            if label in dt_text:
+                details[field] = dd_text
+                del remaining[field]
+        if not remaining:
+            break
+
+    return details
+
+
+class SoupParser:
+    """BeautifulSoup backend.
+
+    ``features`` selects the tree builder ('html.parser' or 'lxml'). With
+    ``restrict`` only the book cards, the pagination <nav> and the <dl>
+    elements are turned into tags via a SoupStrainer; everything else on the
+    page is skipped while parsing.
+    """
+
+    def __init__(self, features: str = 'html.parser', restrict: bool = False):
+        self.features = features
+        self.listing_strainer = SoupStrainer(self.is_listing_element) if restrict else None
+        self.detail_strainer = SoupStrainer('dl') if restrict else None
+
+    @staticmethod
+    def is_listing_element(name, attrs) -> bool:
+        """SoupStrainer filter keeping only book cards and the pagination nav."""
+        if name == 'div':
+            css_class = attrs.get('class', '')
+            if isinstance(css_class, list):
+                css_class = ' '.join(css_class)
+            return css_class == CARD_CLASS
+        return name == 'nav' and attrs.get('aria-label') == 'Page navigation'
+
+    def parse_listing(self, html: str, category_name: str, base_url: str) -> Tuple[int, List[BookRecord]]:
+        """Parse a category page once and return (total pages, books)."""
+        try:
+            soup = BeautifulSoup(html, self.features, parse_only=self.listing_strainer)
+        except Exception as e:
+            logger.error(f"Error parsing page HTML: {e}")
+            return 1, []
+
+        return self.get_total_pages(soup), self.extract_books(soup, category_name, base_url)
+
+    def get_total_pages(self, soup: BeautifulSoup) -> int:
+        """Try to determine total number of pages from pagination."""
+        try:
+            pagination = soup.find('nav', attrs={'aria-label': 'Page navigation'})
+            if not pagination:
+                return 1
+
+            links = [(link.get('href', ''), link.get_text(strip=True))
+                     for link in pagination.find_all('a', class_='page-link')]
+            return max_page_number(links)
+        except Exception as e:
+            logger.error(f"Error determining total pages: {e}")
+            return 1
+
+    def extract_books(self, soup: BeautifulSoup, category_name: str, base_url: str) -> List[BookRecord]:
+        """Extract all book information from a parsed category page."""
+        books = []
+
+        for card in soup.find_all('div', class_=CARD_CLASS):
+            try:
+                # Extract book URL and title
+                title_element = card.find('h5', class_='card-title')
+                link_element = card.find('a', href=True)
+
+                title = title_element.get_text(strip=True) if title_element else ""
+                book_url = link_element['href'] if link_element else ""
+
+                # Extract image URL
+                img_element = card.find('img', class_='img-fluid')
+                image_url = img_element['src'] if img_element else ""
+
+                # Extract author, publisher, and year from list items
+                list_items = card.find_all('li', class_=LIST_ITEM_CLASS)
+                author = list_items[0].get_text(strip=True) if len(list_items) > 0 else ""
+                publisher = list_items[1].get_text(strip=True) if len(list_items) > 1 else ""
+                year = list_items[2].get_text(strip=True) if len(list_items) > 2 else ""
+
+                books.append(make_book(category_name, title, author, publisher, year,
+                                       book_url, image_url, base_url))
+            except Exception as e:
+                logger.error(f"Error extracting book data from card: {e}")
+                continue
+
+        return books
+
+    def parse_details(self, html: str, labels: Dict[str, str] = DETAIL_LABELS) -> Dict[str, str]:
+        """Extract the requested <dt>/<dd> fields from a book page in one pass."""
+        try:
+            soup = BeautifulSoup(html, self.features, parse_only=self.detail_strainer)
+            pairs = []
+            for dt in soup.find_all('dt'):
+                dd = dt.find_next_sibling('dd')
+                if dd:
+                    pairs.append((dt.get_text(), dd.get_text(strip=True)))
+            return match_labels(pairs, labels)
+        except Exception as e:
+            logger.error(f"Error parsing book details: {e}")
+            return {}
+
+
+class LxmlParser:
+    """lxml.html backend using XPath directly, without building a soup."""
+
+    CARD_XPATH = f"//div[@class='{CARD_CLASS}']"
+    PAGE_LINK_XPATH = ("//nav[@aria-label='Page navigation']"
+                       "//a[contains(concat(' ', normalize-space(@class), ' '), ' page-link ')]")
+
+    def __init__(self):
+        import lxml.html
+        self.lxml_html = lxml.html
+
+    @staticmethod
+    def text(element) -> str:
+        """Match BeautifulSoup's get_text(strip=True)."""
+        return ''.join(part.strip() for part in element.itertext())
+
+    @staticmethod
+    def has_class(element, css_class: str) -> bool:
+        """Return True if the element carries css_class among its classes."""
+        return css_class in element.get('class', '').split()
+
+    def parse_listing(self, html: str, category_name: str, base_url: str) -> Tuple[int, List[BookRecord]]:
+        """Parse a category page once and return (total pages, books)."""
+        try:
+            root = self.lxml_html.fromstring(html)
+        except Exception as e:
+            logger.error(f"Error parsing page HTML: {e}")
+            return 1, []
+
+        links = [(link.get('href', ''), self.text(link)) for link in root.xpath(self.PAGE_LINK_XPATH)]
+        total_pages = max_page_number(links)
+
+        books = []
+        for card in root.xpath(self.CARD_XPATH):
+            try:
+                title_element = next((h5 for h5 in card.iter('h5') if self.has_class(h5, 'card-title')), None)
+                link_element = next((a for a in card.iter('a') if a.get('href') is not None), None)
+                img_element = next((img for img in card.iter('img') if self.has_class(img, 'img-fluid')), None)
+                list_items = [li for li in card.iter('li') if li.get('class') == LIST_ITEM_CLASS]
+
+                books.append(make_book(
+                    category_name,
+                    self.text(title_element) if title_element is not None else "",
+                    self.text(list_items[0]) if len(list_items) > 0 else "",
+                    self.text(list_items[1]) if len(list_items) > 1 else "",
+                    self.text(list_items[2]) if len(list_items) > 2 else "",
+                    link_element.get('href') if link_element is not None else "",
+                    img_element.get('src', '') if img_element is not None else "",
+                    base_url,
+                ))
+            except Exception as e:
+                logger.error(f"Error extracting book data from card: {e}")
+                continue
+
+        return total_pages, books
+
+    def parse_details(self, html: str, labels: Dict[str, str] = DETAIL_LABELS) -> Dict[str, str]:
+        """Extract the requested <dt>/<dd> fields from a book page in one pass."""
+        try:
+            root = self.lxml_html.fromstring(html)
+            pairs = []
+            for dt in root.iter('dt'):
+                dd = dt.getnext()
+                while dd is not None and dd.tag != 'dd':
+                    dd = dd.getnext()
+                if dd is not None:
+                    pairs.append((''.join(dt.itertext()), self.text(dd)))
+            return match_labels(pairs, labels)
+        except Exception as e:
+            logger.error(f"Error parsing book details: {e}")
+            return {}
+
+
+class DetailCollector:
+    """Parser target that picks the requested <dt>/<dd> fields out of tag events.
+
+    Matches the backends' ``parse_details``: the first <dt> containing a
+    label wins and the <dd> text is stripped piece by piece.
+    """
+
+    def __init__(self, labels: Dict[str, str]):
+        self.details = {field: '' for field in labels}
+        self.remaining = dict(labels)
+        # Element whose text is being collected ('dt' or 'dd'), its text nodes and the current node
+        self.capturing = None
+        self.parts: List[str] = []
+        self.text: List[str] = []
+        # Fields named by the last <dt>, filled from the next <dd>
+        self.matched: List[str] = []
+
+    def end_node(self):
+        # A text node may be delivered in pieces; it ends at the next tag
+        if self.text:
+            self.parts.append(''.join(self.text))
+            self.text = []
+
+    def end_dt(self):
+        self.end_node()
+        dt_text = ''.join(self.parts)
+        self.matched = [field for field, label in self.remaining.items() if label in dt_text]
+        self.capturing = None
+
+    def end_dd(self):
+        self.end_node()
+        value = ''.join(part.strip() for part in self.parts)
+        for field in self.matched:
+            self.details[field] = value
+            del self.remaining[field]
+        self.capturing, self.matched = None, []
+
+    def start(self, tag, attrs):
+        # <dt> and <dd> may be left unclosed
+        if self.capturing == 'dt' and tag == 'dd':
+            self.end_dt()
+        elif self.capturing == 'dd' and tag in ('dt', 'dd'):
+            self.end_dd()
+        if tag == 'dt':
+            self.capturing, self.parts, self.text, self.matched = 'dt', [], [], []
+        elif tag == 'dd' and self.matched:
+            self.capturing, self.parts, self.text = 'dd', [], []
+        elif self.capturing:
+            self.end_node()
+
+    def end(self, tag):
+        if self.capturing == 'dt' and tag == 'dt':
+            self.end_dt()
+        elif self.capturing == 'dd' and tag in ('dd', 'dl'):
+            self.end_dd()
+        elif self.capturing:
+            self.end_node()
+
+    def data(self, text):
+        if self.capturing:
+            self.text.append(text)
+
+    def close(self):
+        return self.details
+
+
+class EventParser(HTMLParser):
+    """Standard library stand-in for lxml's feed parser, sending tag events to a target."""
+
+    def __init__(self, target, encoding: str):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+
+    def feed(self, chunk: bytes):
+        super().feed(self.decoder.decode(chunk))
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+class StreamingDetailParser:
+    """Incremental detail extractor for a book page read in chunks.
+
+    Feed it the raw bytes as they arrive; ``done`` turns True as soon as
+    every label has been seen with its <dd>, so the caller can stop reading
+    the response. Uses lxml's feed parser when installed and the standard
+    library's HTMLParser otherwise.
+    """
+
+    def __init__(self, labels: Dict[str, str] = DETAIL_LABELS, encoding: str = 'utf-8'):
+        self.collector = DetailCollector(labels)
+        try:
+            from lxml import etree
+            self.parser = etree.HTMLParser(target=self.collector, encoding=encoding)
+        except ImportError:
+            self.parser = EventParser(self.collector, encoding)
+        # Bytes of the page consumed so far
+        self.bytes_read = 0
+
+    @property
+    def details(self) -> Dict[str, str]:
+        return self.collector.details
+
+    @property
+    def done(self) -> bool:
+        return not self.collector.remaining
+
+    def feed_bytes(self, chunk: bytes):
+        """Parse the next chunk of the page; ignored once done."""
+        if self.done:
+            return
+        self.bytes_read += len(chunk)
+        self.parser.feed(chunk)
+
+
+PARSER_BACKENDS = {
+    'html.parser': lambda: SoupParser('html.parser'),
+    'soup-lxml': lambda: SoupParser('lxml'),
+    'strainer': lambda: SoupParser('html.parser', restrict=True),
+    'lxml': LxmlParser,
+}
+
+# lxml is optional; fall back to the standard library parser without it
+try:
+    import lxml.html  # noqa: F401
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+
+
+def get_parser(name: str = DEFAULT_PARSER):
+    """Create a parser backend by name."""
+    try:
+        return PARSER_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown parser backend {name!r}, choose from {', '.join(PARSER_BACKENDS)}")
+    except ImportError as e:
+        raise ValueError(f"Parser backend {name!r} is not available: {e}")
+
+
+# Parsers created in this process, so executor workers build each backend once
+_parser_cache = {}
+
+
+def cached_parser(name: str):
+    """Return this process's parser instance for a backend."""
+    if name not in _parser_cache:
+        _parser_cache[name] = get_parser(name)
+    return _parser_cache[name]
+
+
+def parse_listing(name: str, html: str, category_name: str, base_url: str) -> Tuple[int, List[BookRecord]]:
+    """Parse a category page with the named backend.
+
+    Module-level so it can be sent to a process pool with run_in_executor.
+    """
+    return cached_parser(name).parse_listing(html, category_name, base_url)
+
+
+def parse_details(name: str, html: str, labels: Dict[str, str] = DETAIL_LABELS) -> Dict[str, str]:
+    """Parse a book page with the named backend (see parse_listing)."""
+    return cached_parser(name).parse_details(html, labels)
+
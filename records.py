@@ -0,0 +1,111 @@
+import sys
+from typing import Dict, List, Tuple, Union
+
+from output_writer import get_book_id, CATEGORY_SEPARATOR
+
+# Fields whose values repeat across many books; each distinct value is stored once
+INTERNED_FIELDS = ('category', 'categories', 'author', 'publisher', 'publication_place')
+
+# Fields kept as ints when they hold a plain number
+NUMBER_FIELDS = ('year', 'page_count')
+
+# One shared int object per distinct year or page count (CPython only caches -5..256)
+_numbers: Dict[int, int] = {}
+
+
+def compact_number(value: Union[str, int]) -> Union[str, int]:
+    """Return a plain decimal string as a shared int; anything else ('', '2010-2012') unchanged.
+
+    Strings with leading zeros are left alone so the value is written back
+    exactly as it was scraped.
+    """
+    if isinstance(value, int):
+        return _numbers.setdefault(value, value)
+    if value.isascii() and value.isdigit() and (value == '0' or value[0] != '0'):
+        number = int(value)
+        return _numbers.setdefault(number, number)
+    return value
+
+
+class BookRecord:
+    """A scraped book, stored compactly for catalogue-scale crawls.
+
+    ``__slots__`` drops the per-instance dict, repeated text (category,
+    author, publisher, place) is interned so books share a single copy, and
+    year and page count are stored as ints when they are plain numbers. Rows
+    are converted back to strings only when written (``as_row``).
+    """
+
+    __slots__ = ('category', 'categories', 'title', 'author', 'publisher', 'year',
+                 'publication_place', 'page_count', 'book_url', 'image_url')
+
+    def __init__(self, category: str, title: str, author: str, publisher: str, year: Union[str, int],
+                 book_url: str, image_url: str, publication_place: str = '',
+                 page_count: Union[str, int] = '', categories: str = ''):
+        self.category = sys.intern(category)
+        self.categories = sys.intern(categories)
+        self.title = title
+        self.author = sys.intern(author)
+        self.publisher = sys.intern(publisher)
+        self.year = compact_number(year)
+        self.publication_place = sys.intern(publication_place)
+        self.page_count = compact_number(page_count)
+        self.book_url = book_url
+        self.image_url = image_url
+
+    @classmethod
+    def from_row(cls, row: Dict[str, str]) -> 'BookRecord':
+        """Build a record from a CSV row; missing columns are empty."""
+        return cls(**{field: row.get(field) or '' for field in cls.__slots__})
+
+    def __reduce__(self):
+        # Rebuild through __init__ so records returned by a parse process are re-interned
+        return BookRecord, tuple(getattr(self, field) for field in (
+            'category', 'title', 'author', 'publisher', 'year', 'book_url', 'image_url',
+            'publication_place', 'page_count', 'categories'))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, BookRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self):
+        return f"BookRecord({self.category!r}, {self.title!r}, {self.book_url!r})"
+
+    @property
+    def book_id(self) -> str:
+        return get_book_id(self.book_url)
+
+    def key(self) -> Tuple[str, str]:
+        """Identify the listing by category and book ID, or title for books without a URL."""
+        return self.category, self.book_id or self.title
+
+    def category_list(self) -> List[str]:
+        """Return every category of the book, or just its own when none were recorded."""
+        if self.categories:
+            return self.categories.split(CATEGORY_SEPARATOR)
+        return [self.category]
+
+    def has_details(self) -> bool:
+        """Return True once the detail page fields are filled in."""
+        return self.publication_place != '' and self.page_count != ''
+
+    def update(self, details: Dict[str, str]):
+        """Merge fields read from the book's detail page."""
+        for field, value in details.items():
+            if field in NUMBER_FIELDS:
+                value = compact_number(value)
+            elif field in INTERNED_FIELDS:
+                value = sys.intern(value)
+            setattr(self, field, value)
+
+    def with_category(self, category: str) -> 'BookRecord':
+        """Return a copy of the record listed under another category."""
+        record = BookRecord(category, self.title, self.author, self.publisher, self.year,
+                            self.book_url, self.image_url, self.publication_place, self.page_count,
+                            self.categories)
+        return record
+
+    def as_row(self) -> Dict[str, str]:
+        """Return the record as a CSV row of strings."""
+        return {field: str(getattr(self, field)) for field in self.__slots__}
@@ -0,0 +1,131 @@
+import json
+import sqlite3
+import time
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# A claimed shard is handed to another worker if its lease is not renewed
+SHARD_LEASE_SECONDS = 120
+
+# Attempts per shard before it is given up as failed
+SHARD_MAX_ATTEMPTS = 3
+
+
+class Shard:
+    """A unit of crawl work claimed from the queue."""
+
+    def __init__(self, shard_id: int, payload: Dict, attempts: int):
+        self.id = shard_id
+        self.payload = payload
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f"Shard({self.id}, {self.payload})"
+
+
+class ShardQueue:
+    """Work queue shared by crawl workers through a SQLite file.
+
+    The coordinator adds shards once; workers in any process (or on any host
+    that can lock the file) claim them inside an immediate transaction, so a
+    shard is only ever handed to one worker at a time. A claim is a lease:
+    workers renew it while they crawl, and a shard whose worker died becomes
+    claimable again once the lease expires. Shards that keep failing are
+    marked failed after ``max_attempts``.
+    """
+
+    def __init__(self, path: str, lease: float = SHARD_LEASE_SECONDS, max_attempts: int = SHARD_MAX_ATTEMPTS):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS shards (
+                id INTEGER PRIMARY KEY,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            )
+        """)
+
+    def add(self, payloads: List[Dict]):
+        """Queue new shards in order."""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany("INSERT INTO shards (payload) VALUES (?)",
+                                  [(json.dumps(payload, ensure_ascii=False),) for payload in payloads])
+
+    def is_planned(self) -> bool:
+        """Return True if shards were already added (e.g. by an interrupted run)."""
+        return self.conn.execute("SELECT EXISTS (SELECT 1 FROM shards)").fetchone()[0] == 1
+
+    def claim(self, worker: str) -> Optional[Shard]:
+        """Take the next pending or abandoned shard, or None if there is none."""
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute("""
+                SELECT id, payload, attempts FROM shards
+                WHERE status = 'pending' OR (status = 'claimed' AND lease_until < ?)
+                ORDER BY id LIMIT 1
+            """, (now,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("""
+                UPDATE shards SET status = 'claimed', worker = ?, lease_until = ?, attempts = attempts + 1
+                WHERE id = ?
+            """, (worker, now + self.lease, row[0]))
+        return Shard(row[0], json.loads(row[1]), row[2] + 1)
+
+    def renew(self, shard: Shard, worker: str) -> bool:
+        """Extend a claim; returns False if the shard was handed to someone else."""
+        with self.conn:
+            cursor = self.conn.execute("""
+                UPDATE shards SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'claimed'
+            """, (time.time() + self.lease, shard.id, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, shard: Shard):
+        """Mark a shard as done."""
+        with self.conn:
+            self.conn.execute("UPDATE shards SET status = 'done', lease_until = NULL, error = NULL WHERE id = ?",
+                              (shard.id,))
+
+    def release(self, shard: Shard, error: str):
+        """Return a shard after a failed attempt, or give it up after the last one."""
+        status = 'failed' if shard.attempts >= self.max_attempts else 'pending'
+        with self.conn:
+            self.conn.execute("UPDATE shards SET status = ?, lease_until = NULL, error = ? WHERE id = ?",
+                              (status, error, shard.id))
+        if status == 'failed':
+            logger.error(f"Giving up on {shard} after {shard.attempts} attempts: {error}")
+
+    def retry_failed(self) -> int:
+        """Make failed shards claimable again with fresh attempts; returns how many."""
+        with self.conn:
+            cursor = self.conn.execute("UPDATE shards SET status = 'pending', attempts = 0 WHERE status = 'failed'")
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of shards per status."""
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall())
+
+    def is_finished(self) -> bool:
+        """Return True once every shard is done or failed."""
+        return self.conn.execute(
+            "SELECT NOT EXISTS (SELECT 1 FROM shards WHERE status IN ('pending', 'claimed'))").fetchone()[0] == 1
+
+    def shards(self) -> List[Shard]:
+        """Return all shards in queue order."""
+        return [Shard(shard_id, json.loads(payload), attempts) for shard_id, payload, attempts
+                in self.conn.execute("SELECT id, payload, attempts FROM shards ORDER BY id")]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,329 @@
+import asyncio
+import csv
+import logging
+import multiprocessing
+import os
+import shutil
+import socket
+import time
+from typing import Dict, List
+from urllib.parse import urljoin
+
+from async_scraper import (CATEGORIES, CATEGORY_NAMES, CSV_FIELDNAMES, BookIndex, build_arg_parser,
+                           create_parse_executor, create_scheduler, create_session, fetch_page)
+from aggregate_store import AggregateStore, aggregates_path
+from catalogue_index import build_catalogue_index
+from columnar import write_columnar
+from cover_downloader import CoverDownloader, create_cover_downloader
+from crawl_logging import configure_logging
+from crawl_metrics import Metrics, start_metrics_server
+from flow_control import HostRateLimiter, RetryPolicy
+from http_cache import HTTPCache
+from output_writer import StreamingCSVWriter
+from parsers import parse_listing
+from records import BookRecord
+from shard_queue import Shard, ShardQueue
+
+logger = logging.getLogger(__name__)
+
+# Listing pages per shard; each shard also fetches the details of its books
+PAGES_PER_SHARD = 20
+
+# How often idle workers and the coordinator check the queue, and how often
+# the coordinator logs progress, in seconds
+POLL_INTERVAL = 2
+PROGRESS_INTERVAL = 30
+
+
+def shard_output(shard_dir: str, shard: Shard) -> str:
+    """Return the CSV a shard's rows are written to."""
+    return os.path.join(shard_dir, f"shard-{shard.id:05d}.csv")
+
+
+def split_pages(category_path: str, total_pages: int, pages_per_shard: int) -> List[Dict]:
+    """Split a category into page ranges; the last range is open-ended."""
+    shards = []
+    for first_page in range(1, max(total_pages, 1) + 1, pages_per_shard):
+        last_page = first_page + pages_per_shard - 1
+        shards.append({
+            'category': category_path,
+            'first_page': first_page,
+            'last_page': last_page if last_page < total_pages else None,
+        })
+    return shards
+
+
+async def plan_shards(args, cache: HTTPCache) -> List[Dict]:
+    """Fetch page 1 of every category and split the crawl into page-range shards.
+
+    Incremental runs follow a category's pages one after another until one
+    has no new books, so they get one shard per category instead.
+    """
+    if args.incremental or args.pages_per_shard <= 0:
+        return [{'category': path, 'first_page': 1, 'last_page': None} for path in CATEGORIES]
+
+    rate_limiter = HostRateLimiter(args.rate, args.burst)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    retry = RetryPolicy(args.retries)
+
+    async def count_pages(session, category_path: str) -> int:
+        url = urljoin(args.base_url, category_path)
+        async with semaphore:
+            await rate_limiter.acquire(url)
+            html = await fetch_page(session, url, cache, retry)
+        if not html:
+            # Leave the whole category to a single shard, which retries page 1
+            logger.warning(f"Could not count pages of {category_path}, queueing it as one shard")
+            return 1
+        total_pages, _ = parse_listing(args.parser, html, category_path.split('/')[-1], args.base_url)
+        return total_pages
+
+    async with create_session(args, Metrics()) as session:
+        totals = await asyncio.gather(*(count_pages(session, path) for path in CATEGORIES))
+
+    shards = []
+    for category_path, total_pages in zip(CATEGORIES, totals):
+        shards.extend(split_pages(category_path, total_pages, args.pages_per_shard))
+    logger.info(f"Planned {len(shards)} shards over {sum(totals)} listing pages")
+    return shards
+
+
+async def renew_lease(queue: ShardQueue, shard: Shard, worker_id: str, crawl: asyncio.Task):
+    """Keep a shard claimed while it is crawled; stop the crawl if the claim is lost."""
+    while True:
+        await asyncio.sleep(queue.lease / 4)
+        if not queue.renew(shard, worker_id):
+            logger.error(f"Lost the lease on {shard}, stopping")
+            crawl.cancel()
+            return
+
+
+async def crawl_shard(session, args, queue: ShardQueue, shard: Shard, worker_id: str, shard_dir: str,
+                      cache: HTTPCache, index: BookIndex, parse_executor, metrics: Metrics,
+                      rate_limiter: HostRateLimiter, covers: CoverDownloader = None) -> int:
+    """Crawl one shard into its own CSV and report the outcome to the queue."""
+    payload = shard.payload
+    logger.info(f"[{worker_id}] Claimed {shard} (attempt {shard.attempts})")
+
+    # A shard retried after a failure continues from the previous attempt's partial file
+    writer = StreamingCSVWriter(shard_output(shard_dir, shard), CSV_FIELDNAMES, args.flush_every, resume=True)
+    scheduler = create_scheduler(session, args, writer, cache, index, parse_executor, metrics, rate_limiter)
+    scheduler.covers = covers
+    crawl = asyncio.ensure_future(scheduler.run([payload['category']],
+                                                (payload['first_page'], payload['last_page'])))
+    keepalive = asyncio.create_task(renew_lease(queue, shard, worker_id, crawl))
+    try:
+        books = await crawl
+    except asyncio.CancelledError:
+        writer.abort()
+        if keepalive.done():
+            return 0
+        queue.release(shard, "worker stopped")
+        raise
+    except Exception as e:
+        writer.abort()
+        queue.release(shard, f"{type(e).__name__}: {e}")
+        return 0
+    finally:
+        keepalive.cancel()
+
+    # Failed pages include listing jobs that raised; the queue retries the shard or marks it failed
+    if scheduler.incomplete_categories():
+        failed_pages = sum(state.failed_pages for state in scheduler.categories.values())
+        writer.abort()
+        queue.release(shard, f"{failed_pages} listing pages failed")
+        return 0
+
+    writer.close()
+    queue.complete(shard)
+    logger.info(f"[{worker_id}] Finished {shard}: {books} books, {scheduler.requests} requests")
+    return books
+
+
+async def run_worker(args, queue_path: str, shard_dir: str, worker_id: str, metrics_port: int = None):
+    """Claim and crawl shards until every shard of the queue is finished."""
+    queue = ShardQueue(queue_path)
+    cache = None if args.no_cache else HTTPCache(args.cache, args.cache_size_mb * 1024 * 1024)
+    index = BookIndex.load(args.output) if args.incremental else None
+    parse_executor = create_parse_executor(args.parse_executor, args.parse_workers)
+    metrics = Metrics()
+    metrics_server = await start_metrics_server(metrics, metrics_port) if metrics_port else None
+
+    started = time.monotonic()
+    shards = books = 0
+    try:
+        async with create_session(args, metrics) as session:
+            # One per-host budget for every shard and cover this worker fetches
+            rate_limiter = HostRateLimiter(args.rate, args.burst)
+            covers = create_cover_downloader(session, args, rate_limiter, RetryPolicy(args.retries), metrics)
+            try:
+                while True:
+                    shard = queue.claim(worker_id)
+                    if shard is None:
+                        if queue.is_finished():
+                            break
+                        # Everything left is claimed; wait in case a lease expires
+                        await asyncio.sleep(POLL_INTERVAL)
+                        continue
+                    books += await crawl_shard(session, args, queue, shard, worker_id, shard_dir, cache,
+                                               index, parse_executor, metrics, rate_limiter, covers)
+                    shards += 1
+                if covers:
+                    await covers.join()
+                    covers.log_summary()
+            finally:
+                if covers:
+                    covers.close()
+    finally:
+        queue.close()
+        if cache:
+            cache.close()
+        if parse_executor:
+            parse_executor.shutdown()
+        if metrics_server:
+            await metrics_server.cleanup()
+
+    elapsed = time.monotonic() - started
+    requests = metrics.counters.get('requests_total', {})
+    logger.info(f"[{worker_id}] Worker done: {shards} shards, {books} books, {sum(requests.values()):.0f} "
+                f"requests in {elapsed:.1f}s")
+    metrics.log_summary()
+    if args.metrics_json:
+        root, ext = os.path.splitext(args.metrics_json)
+        metrics.write_json(f"{root}.{worker_id}{ext or '.json'}")
+
+
+def worker_process(args, queue_path: str, shard_dir: str, worker_id: str, metrics_port: int = None):
+    """Entry point of a local worker process."""
+    # The coordinator's log listener thread does not exist in this process
+    stop_logging = configure_logging(args)
+    try:
+        asyncio.run(run_worker(args, queue_path, shard_dir, worker_id, metrics_port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_logging()
+
+
+def merge_shards(args, queue: ShardQueue, shard_dir: str) -> int:
+    """Concatenate shard outputs in queue order into the final CSV, dropping duplicate rows.
+
+    Books found by several shards are kept once, with the categories of all of them.
+
+    Returns the number of shards whose output is missing or incomplete.
+    """
+    aggregates = None if args.no_aggregates else AggregateStore.for_writing(aggregates_path(args.output))
+    writer = StreamingCSVWriter(args.output, CSV_FIELDNAMES, args.flush_every, aggregates=aggregates,
+                                category_order=CATEGORY_NAMES)
+    incomplete = 0
+    read = 0
+
+    for shard in queue.shards():
+        path = shard_output(shard_dir, shard)
+        if not os.path.exists(path):
+            incomplete += 1
+            if not os.path.exists(f"{path}.partial"):
+                logger.warning(f"No output for {shard}")
+                continue
+            logger.warning(f"Merging incomplete output of {shard}")
+            path = f"{path}.partial"
+
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                read += 1
+                book = BookRecord.from_row(row)
+                for category in book.category_list():
+                    writer.write(book if category == book.category else book.with_category(category))
+
+    if args.incremental:
+        for book in BookIndex.load(args.output).unseen(writer):
+            writer.write(book)
+
+    writer.close()
+    logger.info(f"Merged {read} shard rows into {writer.rows} books ({read - writer.rows} duplicates dropped)")
+    return incomplete
+
+
+def main():
+    parser = build_arg_parser("Crawl the ebooks.az catalogue with several worker processes")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="local worker processes; 0 waits for remote workers only (default: CPU count)")
+    parser.add_argument('--worker', action='store_true',
+                        help="only join an existing shard queue as a worker (e.g. on another host)")
+    parser.add_argument('--worker-id', default=f"{socket.gethostname()}-{os.getpid()}",
+                        help="name of this worker in the shard queue (default: host-pid)")
+    parser.add_argument('--shard-dir',
+                        help="directory holding the shard queue and shard outputs (default: <output>.shards)")
+    parser.add_argument('--pages-per-shard', type=int, default=PAGES_PER_SHARD,
+                        help=f"listing pages per shard, 0 for one shard per category (default: {PAGES_PER_SHARD})")
+    args = parser.parse_args()
+    configure_logging(args)
+
+    shard_dir = args.shard_dir or f"{args.output}.shards"
+    queue_path = os.path.join(shard_dir, 'queue.sqlite')
+
+    if args.worker:
+        asyncio.run(run_worker(args, queue_path, shard_dir, args.worker_id, args.metrics_port))
+        return
+
+    os.makedirs(shard_dir, exist_ok=True)
+    queue = ShardQueue(queue_path)
+    if queue.is_planned():
+        retried = queue.retry_failed()
+        logger.info(f"Resuming shard queue {queue_path}: {queue.counts()}"
+                    + (f", retrying {retried} failed shards" if retried else ""))
+    else:
+        cache = None if args.no_cache else HTTPCache(args.cache, args.cache_size_mb * 1024 * 1024)
+        try:
+            queue.add(asyncio.run(plan_shards(args, cache)))
+        finally:
+            if cache:
+                cache.close()
+
+    started = time.monotonic()
+    workers = []
+    for i in range(args.workers):
+        metrics_port = args.metrics_port + i if args.metrics_port else None
+        process = multiprocessing.Process(target=worker_process, name=f"worker-{i}",
+                                          args=(args, queue_path, shard_dir, f"{args.worker_id}-{i}",
+                                                metrics_port))
+        process.start()
+        workers.append(process)
+    logger.info(f"Started {len(workers)} local workers on {queue_path}")
+
+    try:
+        last_report = time.monotonic()
+        while not queue.is_finished():
+            time.sleep(POLL_INTERVAL)
+            if workers and not any(process.is_alive() for process in workers) and not queue.is_finished():
+                # Shards they held are reclaimed once their leases expire, e.g. by the next run
+                exit_codes = ', '.join(str(process.exitcode) for process in workers)
+                logger.error(f"Every local worker has exited (exit codes {exit_codes}) with shards unfinished: "
+                             f"{queue.counts()}; run again to resume the queue")
+                raise SystemExit(1)
+            if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                logger.info(f"Shards: {queue.counts()}")
+                last_report = time.monotonic()
+    finally:
+        for process in workers:
+            process.join()
+
+    incomplete = merge_shards(args, queue, shard_dir)
+    counts = queue.counts()
+    queue.close()
+    logger.info(f"Sharded crawl finished in {time.monotonic() - started:.1f}s: {counts}")
+
+    if incomplete:
+        logger.warning(f"{incomplete} shards are incomplete; their outputs are kept in {shard_dir}, "
+                       f"run again to retry them")
+    else:
+        shutil.rmtree(shard_dir)
+
+    if not args.no_catalogue:
+        build_catalogue_index(args.output)
+    if args.columnar != 'none':
+        write_columnar(args.output, fmt=args.columnar)
+
+
+if __name__ == "__main__":
+    main()
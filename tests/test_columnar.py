@@ -0,0 +1,29 @@
+import csv
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from columnar import write_columnar
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def test_out_of_range_integers_become_null(tmp_path):
+    csv_file = tmp_path / 'books.csv'
+    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['category', 'title', 'publisher', 'year', 'publication_place', 'page_count'])
+        writer.writerow(['history', 'Fits', 'Elm', '2010', 'Bakı', '366'])
+        writer.writerow(['history', 'Overflows', 'Elm', '40000', 'Bakı', '3000000000'])
+        writer.writerow(['history', 'Too long for int64', 'Elm', '9' * 25, 'Bakı', '9' * 25])
+        writer.writerow(['history', 'Not a number', 'Elm', '2010-2012', 'Bakı', '366 s.'])
+
+    table = pq.read_table(write_columnar(str(csv_file)))
+
+    assert str(table.schema.field('year').type) == 'int16'
+    assert str(table.schema.field('page_count').type) == 'int32'
+    assert table.column('year').to_pylist() == [2010, None, None, None]
+    assert table.column('page_count').to_pylist() == [366, None, None, None]
@@ -0,0 +1,30 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from http_cache import HTTPCache
+
+
+def test_two_caches_share_one_file(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    first = HTTPCache(path)
+    second = HTTPCache(path)
+    # Fail fast instead of waiting out the busy timeout if a lock is left held
+    for cache in (first, second):
+        cache.conn.execute("PRAGMA busy_timeout = 100")
+
+    urls = [f"https://www.ebooks.az/az/elibrary/ebook/{number}" for number in range(20)]
+    for number, url in enumerate(urls):
+        writer, reader = (first, second) if number % 2 else (second, first)
+        writer.put(url, f"page {number}", etag=f'"{number}"')
+        assert reader.get(url).body == f"page {number}"
+        assert writer.get(urls[0]).body == "page 0"
+
+    first.close()
+    second.close()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == len(urls)
+    conn.close()
@@ -0,0 +1,74 @@
+import asyncio
+import csv
+import json
+import socket
+import sqlite3
+import sys
+from pathlib import Path
+
+from aiohttp import web
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+sys.path.insert(0, str(REPO / 'benchmarks'))
+
+import async_scraper
+from mock_server import create_app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def read_rows(path: Path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return sorted(tuple(row.values()) for row in csv.DictReader(f))
+
+
+async def crawl(base_url: str, workdir: Path, cache: Path) -> dict:
+    """Crawl the mock site into workdir and return the responses counted per status."""
+    workdir.mkdir()
+    args = async_scraper.parse_args([
+        '--base-url', base_url,
+        '--output', str(workdir / 'books.csv'),
+        '--metrics-json', str(workdir / 'metrics.json'),
+        '--cache', str(cache),
+        '--rate', '0',
+        '--columnar', 'none',
+        '--no-catalogue',
+    ])
+    await async_scraper.main(args)
+    metrics = json.loads((workdir / 'metrics.json').read_text(encoding='utf-8'))
+    return {labels.split('=', 1)[1]: int(count)
+            for labels, count in metrics['counters'].get('http_responses_total', {}).items()}
+
+
+def test_stale_recrawl_revalidates(tmp_path):
+    cache = tmp_path / 'http_cache.sqlite'
+
+    async def run():
+        runner = web.AppRunner(create_app(books=300, latency_ms=0, jitter_ms=0, overlap=0.1))
+        await runner.setup()
+        port = free_port()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            first = await crawl(base_url, tmp_path / 'first', cache)
+
+            conn = sqlite3.connect(cache)
+            with conn:
+                conn.execute("UPDATE responses SET fetched_at = 0")
+            conn.close()
+
+            second = await crawl(base_url, tmp_path / 'second', cache)
+        finally:
+            await runner.cleanup()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first.get('200') and '304' not in first
+    assert second == {'304': first['200']}
+    assert read_rows(tmp_path / 'second' / 'books.csv') == read_rows(tmp_path / 'first' / 'books.csv')